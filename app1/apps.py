@@ -1,6 +1,23 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class App1Config(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "app1"
+
+    def ready(self):
+        # StockResumen incremental y generaciones de la caché de lecturas
+        from . import signals  # noqa: F401
+        post_migrate.connect(_asegurar_indice_busqueda, sender=self)
+
+
+def _asegurar_indice_busqueda(sender, using="default", **kwargs):
+    # En SQLite, una migración que recrea app1_zapato borra los triggers del índice FTS
+    from django.db import connections
+    from django.db.migrations.recorder import MigrationRecorder
+    from .services.busqueda import instalar_indice
+
+    conexion = connections[using]
+    if ("app1", "0018_zapato_busqueda") in MigrationRecorder(conexion).applied_migrations():
+        instalar_indice(conexion)
@@ -6,9 +6,12 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'zodiak_inventory.settings')
 django.setup()
 
 from .models import Zapato, Pedido
+from .services.borrado_service import borrado_en_bloque
 
 # Borra todos los registros de las tablas Zapato y Pedido
-Zapato.objects.all().delete()
-Pedido.objects.all().delete()
+# (en bloque: StockResumen se ajusta una vez por clave, no por zapato)
+with borrado_en_bloque():
+    Zapato.objects.all().delete()
+    Pedido.objects.all().delete()
 
 print("Todos los registros de Zapato y Pedido han sido eliminados.")
\ No newline at end of file
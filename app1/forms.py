@@ -28,6 +28,6 @@ class ZapatoForm(forms.ModelForm):
 
 class QRFileUploadForm(forms.Form):
     archivo = forms.FileField(
-        label="Sube una imagen o PDF con QR",
+        label="Sube una imagen, PDF o video con QR",
         widget=forms.ClearableFileInput(attrs={'class': 'form-control'})
     )
\ No newline at end of file
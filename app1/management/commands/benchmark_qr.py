@@ -0,0 +1,64 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from app1.models import Cliente, Pedido, Zapato
+from app1.services.qr_benchmark import construir_corpus, ejecutar_benchmark, readers_registrados
+from app1.services.pedido_pdf import PedidoPDFBuilder
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide velocidad y recall de los QRReader sobre un corpus sintético "
+        "(etiquetas degradadas y páginas de pedido). Imprime JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--zapatos", type=int, default=10, help="Zapatos sintéticos en el corpus")
+        parser.add_argument("--reader", action="append",
+                            help="Ruta de un QRReader (se puede repetir). Por defecto: todos los registrados")
+        parser.add_argument("--output", help="Guarda el JSON en este archivo en vez de imprimirlo")
+
+    def handle(self, *args, **options):
+        if options["reader"]:
+            try:
+                readers = {ruta: import_string(ruta) for ruta in options["reader"]}
+            except ImportError as e:
+                raise CommandError(str(e))
+        else:
+            readers = readers_registrados()
+            readers.setdefault(settings.QR_READER_CLASS, import_string(settings.QR_READER_CLASS))
+
+        # Objetos sin guardar: el benchmark no toca la base de datos
+        modelos = [m for m, _ in Zapato.MODELO_CHOICES]
+        colores = [c for c, _ in Zapato.COLOR_CHOICES]
+        zapatos = [
+            Zapato(
+                id=100000 + i,
+                referencia=f"{modelos[i % len(modelos)][:2].upper()}{38 + i % 6}{colores[i % len(colores)][0]}HA",
+                modelo=modelos[i % len(modelos)],
+                talla=str(38 + i % 6),
+                sexo="H",
+                color=colores[i % len(colores)],
+                requerimientos="Suela antideslizante, plantilla acolchada " * (1 + i % 3),
+                observaciones="Sin observaciones",
+                estado="Producción",
+            )
+            for i in range(options["zapatos"])
+        ]
+        pedido = Pedido(id=1, fecha_creacion=timezone.now(), observaciones="Benchmark")
+        cliente = Cliente(nombre="Benchmark")
+
+        corpus = construir_corpus(zapatos, PedidoPDFBuilder, pedido, cliente)
+        resultado = ejecutar_benchmark(readers, corpus)
+
+        salida = json.dumps(resultado, indent=2, ensure_ascii=False)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                f.write(salida)
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['output']}"))
+        else:
+            self.stdout.write(salida)
@@ -0,0 +1,37 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app1.models import Zapato
+from app1.services.referencia import ReferenciaBuilder
+from app1.services.label_sheet import get_label_sheet_builder
+
+
+class Command(BaseCommand):
+    help = "Genera un PDF con hojas de etiquetas QR (p.ej. para re-etiquetar la Bodega)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--estado", action="append", help="Estado a incluir (se puede repetir). Por defecto: Bodega")
+        parser.add_argument("--modelo")
+        parser.add_argument("--referencia")
+        parser.add_argument("--columnas", type=int, help="De 1 a 10")
+        parser.add_argument("--filas", type=int, help="De 1 a 10")
+        parser.add_argument("--output", help="Ruta del PDF (por defecto MEDIA_ROOT/etiquetas/...)")
+
+    def handle(self, *args, **options):
+        filtros = {"estado__in": options["estado"] or ["Bodega"]}
+        if options["modelo"]:
+            filtros["modelo"] = options["modelo"]
+        if options["referencia"]:
+            filtros["referencia_normalizada"] = ReferenciaBuilder.normalizar(options["referencia"])
+
+        output = options["output"] or os.path.join(
+            settings.MEDIA_ROOT, "etiquetas",
+            f"etiquetas_{timezone.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+        )
+        zapatos = Zapato.objects.filter(**filtros).order_by("modelo", "referencia", "id")
+        builder = get_label_sheet_builder(options["columnas"], options["filas"])
+        total = builder.build_file(zapatos, output)
+        self.stdout.write(self.style.SUCCESS(f"{total} etiqueta(s) generada(s) en {output}"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from app1.services.stock_service import reconstruir
+
+
+class Command(BaseCommand):
+    help = "Reconstruye StockResumen desde la tabla de zapatos e informa cuántas claves estaban desfasadas."
+
+    def handle(self, *args, **options):
+        diferencias = reconstruir()
+        if diferencias:
+            self.stdout.write(self.style.WARNING(f"{diferencias} clave(s) corregida(s) en StockResumen"))
+        else:
+            self.stdout.write(self.style.SUCCESS("StockResumen ya estaba al día"))
@@ -0,0 +1,17 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from app1.services.eventos_service import rollup_diario
+
+
+class Command(BaseCommand):
+    help = "Actualiza los agregados diarios de ZapatoEvento (para correr periódicamente, p.ej. con cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--desde", type=date.fromisoformat,
+                            help="Recalcular desde este día (AAAA-MM-DD). Por defecto: el último día agregado")
+
+    def handle(self, *args, **options):
+        filas = rollup_diario(options["desde"])
+        self.stdout.write(self.style.SUCCESS(f"{filas} fila(s) agregada(s) escrita(s)"))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app1.services.query_plan import verificar_planes
+
+
+class Command(BaseCommand):
+    help = (
+        "Explica las consultas calientes sobre Zapato y falla si alguna recorre la tabla "
+        "completa (SQLite o MySQL). manage.py test lo comprueba sobre la base de pruebas; "
+        "este comando sirve para revisar una base real (--database)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        fallos = []
+        for consulta in verificar_planes(options["database"]):
+            estado = "SCAN" if consulta.tablas_escaneadas else "ok"
+            self.stdout.write(f"[{estado}] {consulta.nombre}")
+            for linea in consulta.plan:
+                self.stdout.write(f"    {linea}")
+            if consulta.tablas_escaneadas:
+                fallos.append(f"{consulta.nombre} ({', '.join(consulta.tablas_escaneadas)})")
+
+        if fallos:
+            raise CommandError(f"Consultas con recorrido completo: {'; '.join(fallos)}")
+        self.stdout.write(self.style.SUCCESS("Todas las consultas críticas usan índices"))
@@ -0,0 +1,41 @@
+# Generated by Django 5.2 on 2026-10-17 03:45
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0012_alter_zapato_imagen'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ZapatoEvento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(max_length=10)),
+                ('estado_anterior', models.CharField(blank=True, default='', max_length=10)),
+                ('estado_nuevo', models.CharField(blank=True, default='', max_length=10)),
+                ('origen', models.CharField(blank=True, default='', max_length=10)),
+                ('fecha', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('empleado', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('zapato', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='eventos', to='app1.zapato')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ZapatoEventoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(db_index=True)),
+                ('modelo', models.CharField(max_length=10)),
+                ('estado_anterior', models.CharField(blank=True, default='', max_length=10)),
+                ('estado_nuevo', models.CharField(blank=True, default='', max_length=10)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('empleado', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
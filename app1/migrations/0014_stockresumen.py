@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-17 03:47
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def llenar_stock(apps, schema_editor):
+    Zapato = apps.get_model('app1', 'Zapato')
+    StockResumen = apps.get_model('app1', 'StockResumen')
+    campos = ('modelo', 'talla', 'color', 'sexo', 'estado')
+    grupos = Zapato.objects.values(*campos).annotate(cantidad=Count('id')).order_by()
+    StockResumen.objects.bulk_create([StockResumen(**g) for g in grupos], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0013_zapatoevento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockResumen',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(max_length=10)),
+                ('talla', models.CharField(max_length=2)),
+                ('color', models.CharField(max_length=10)),
+                ('sexo', models.CharField(max_length=1)),
+                ('estado', models.CharField(max_length=10)),
+                ('cantidad', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('modelo', 'talla', 'color', 'sexo', 'estado'), name='stock_resumen_clave')],
+            },
+        ),
+        migrations.RunPython(llenar_stock, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2 on 2026-10-17 03:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0014_stockresumen'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeneracionCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(max_length=50, unique=True)),
+                ('valor', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+    ]
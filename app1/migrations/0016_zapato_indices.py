@@ -0,0 +1,25 @@
+# Generated by Django 5.2 on 2026-10-17 03:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0015_generacioncache'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='zapato',
+            index=models.Index(fields=['referencia', 'estado'], name='zapato_ref_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='zapato',
+            index=models.Index(fields=['modelo', 'referencia'], name='zapato_modelo_ref_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='zapato',
+            index=models.Index(fields=['estado', 'modelo', 'referencia'], name='zapato_estado_modelo_idx'),
+        ),
+    ]
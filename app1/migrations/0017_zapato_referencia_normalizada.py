@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-17 03:51
+
+from django.db import migrations, models
+from django.db.models.functions import Trim, Upper
+
+
+def normalizar_referencias(apps, schema_editor):
+    # Equivalente a ReferenciaBuilder.normalizar, en un solo UPDATE
+    Zapato = apps.get_model('app1', 'Zapato')
+    Zapato.objects.update(referencia_normalizada=Upper(Trim('referencia')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0016_zapato_indices'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='zapato',
+            name='zapato_ref_estado_idx',
+        ),
+        migrations.AddField(
+            model_name='zapato',
+            name='referencia_normalizada',
+            field=models.CharField(default='', editable=False, max_length=20),
+        ),
+        migrations.RunPython(normalizar_referencias, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='zapato',
+            index=models.Index(fields=['referencia_normalizada', 'estado'], name='zapato_refnorm_estado_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+def crear_indice(apps, schema_editor):
+    from app1.services.busqueda import instalar_indice
+    instalar_indice(schema_editor.connection, reconstruir=True)
+
+
+def borrar_indice(apps, schema_editor):
+    from app1.services.busqueda import TABLA_FTS
+    with schema_editor.connection.cursor() as cursor:
+        if schema_editor.connection.vendor == "sqlite":
+            for sufijo in ("ai", "ad", "au"):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {TABLA_FTS}_{sufijo}")
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLA_FTS}")
+        elif schema_editor.connection.vendor == "mysql":
+            cursor.execute("ALTER TABLE app1_zapato DROP INDEX zapato_fulltext")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0017_zapato_referencia_normalizada'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, borrar_indice),
+    ]
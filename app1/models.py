@@ -1,6 +1,9 @@
 # app1/models.py
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
+
+from .services.referencia import ReferenciaBuilder
 
 class Empleado(AbstractUser):
     cedula = models.CharField(max_length=15, unique=True, null=True, blank=True)
@@ -52,7 +55,19 @@ class Zapato(models.Model):
         ('Entregado', 'Entregado'),
         ('Bodega', 'En Bodega'),
     ]
+    # Transiciones permitidas: estado actual -> estados a los que puede pasar.
+    # Las aplica en bloque app1.services.estado_service.aplicar_transicion
+    TRANSICIONES = {
+        'Pendientes': {'Producción', 'Bodega', 'Anulado'},
+        'Producción': {'Completado', 'Bodega', 'Anulado'},
+        'Completado': {'Entregado', 'Bodega'},
+        'Bodega': {'Pendientes', 'Entregado', 'Anulado'},
+        'Anulado': {'Pendientes'},
+        'Entregado': set(),  # estado final
+    }
     referencia = models.CharField(max_length=20)
+    # Referencia sin espacios y en mayúsculas (ReferenciaBuilder.normalizar); todas las búsquedas van por aquí
+    referencia_normalizada = models.CharField(max_length=20, default='', editable=False)
     # El modelo es lo mismo que la categoría del zapato
     modelo = models.CharField(max_length=10, choices=MODELO_CHOICES) # En el formulario se puede manejar a través de opciones
     talla = models.CharField(max_length=2, choices=TALLAS_CHOICES)
@@ -64,6 +79,38 @@ class Zapato(models.Model):
     pedido = models.ForeignKey('Pedido', on_delete=models.CASCADE, null=True, blank=True) # Relación uno a muchos con la tabla Pedido
     imagen = models.CharField(max_length=150, null=True, blank=True)
 
+    class Meta:
+        # Elegidos según las consultas reales (ver services/query_plan.py):
+        # - referencia_normalizada (+estado): get_or_create del carrito, borrado
+        #   por referencia, los 'Pendientes' de una referencia al generar el
+        #   pedido y la resolución de etiquetas por referencia
+        # - modelo, referencia (+id implícito): orden de Ver Stock y filtro por modelo
+        # - estado, modelo, referencia: filtro por estado con el mismo orden
+        indexes = [
+            models.Index(fields=['referencia_normalizada', 'estado'], name='zapato_refnorm_estado_idx'),
+            models.Index(fields=['modelo', 'referencia'], name='zapato_modelo_ref_idx'),
+            models.Index(fields=['estado', 'modelo', 'referencia'], name='zapato_estado_modelo_idx'),
+        ]
+
+    # Campos que agrupa StockResumen
+    CAMPOS_STOCK = ('modelo', 'talla', 'color', 'sexo', 'estado')
+
+    def save(self, *args, **kwargs):
+        self.referencia_normalizada = ReferenciaBuilder.normalizar(self.referencia)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'referencia' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'referencia_normalizada'}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Clave de stock con la que se leyó, para mover el conteo si cambia al guardar,
+        instancia._clave_stock_db = tuple(instancia.__dict__.get(c) for c in cls.CAMPOS_STOCK)
+        # y la referencia, para el índice de autocompletado
+        instancia._referencia_db = instancia.__dict__.get('referencia_normalizada')
+        return instancia
+
 class Cliente(models.Model):
     nombre = models.CharField(max_length=100, unique=True)
     direccion = models.CharField(max_length=200)
@@ -83,3 +130,56 @@ class Pedido(models.Model):
     estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default='Pendiente') # El estado por defecto es pendiente
     observaciones = models.TextField(default='Sin observaciones', null=True, blank=True) # El campo observaciones es opcional
     cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE) # Relación uno a muchos con la tabla Cliente
+
+
+class ZapatoEvento(models.Model):
+    """
+    Historial de cambios de estado (solo se inserta, nunca se modifica).
+    estado_anterior vacío = alta del zapato; estado_nuevo vacío = baja.
+    El modelo se copia para que el historial sobreviva al borrado del zapato.
+    """
+    zapato = models.ForeignKey(Zapato, on_delete=models.DO_NOTHING, db_constraint=False, related_name='eventos')
+    modelo = models.CharField(max_length=10)
+    estado_anterior = models.CharField(max_length=10, blank=True, default='')
+    estado_nuevo = models.CharField(max_length=10, blank=True, default='')
+    empleado = models.ForeignKey(Empleado, on_delete=models.SET_NULL, null=True, blank=True)
+    origen = models.CharField(max_length=10, blank=True, default='')  # qr, pedido, carrito
+    fecha = models.DateTimeField(default=timezone.now, db_index=True)
+
+
+class ZapatoEventoDiario(models.Model):
+    """Agregado diario de ZapatoEvento por modelo, empleado y transición (lo mantiene rollup_eventos)."""
+    dia = models.DateField(db_index=True)
+    modelo = models.CharField(max_length=10)
+    empleado = models.ForeignKey(Empleado, on_delete=models.SET_NULL, null=True, blank=True)
+    estado_anterior = models.CharField(max_length=10, blank=True, default='')
+    estado_nuevo = models.CharField(max_length=10, blank=True, default='')
+    cantidad = models.PositiveIntegerField(default=0)
+
+
+class StockResumen(models.Model):
+    """
+    Conteo materializado de zapatos por (modelo, talla, color, sexo, estado).
+    Se mantiene de forma incremental (app1.services.stock_service) y se
+    puede reconstruir con el comando reconciliar_stock.
+    """
+    modelo = models.CharField(max_length=10)
+    talla = models.CharField(max_length=2)
+    color = models.CharField(max_length=10)
+    sexo = models.CharField(max_length=1)
+    estado = models.CharField(max_length=10)
+    cantidad = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['modelo', 'talla', 'color', 'sexo', 'estado'], name='stock_resumen_clave'),
+        ]
+
+
+class GeneracionCache(models.Model):
+    """
+    Contador por modelo que se incrementa en cada escritura (señales y caminos
+    en bloque). Las cachés de lectura lo usan como parte de la clave.
+    """
+    modelo = models.CharField(max_length=50, unique=True)
+    valor = models.PositiveBigIntegerField(default=0)
@@ -0,0 +1,58 @@
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Optional
+
+from django.db import transaction
+
+from app1.models import Zapato
+from . import stock_service
+from .read_cache import incrementar
+from .typeahead import referencias_quitadas
+
+_local = threading.local()
+
+
+class BorradoEnBloque:
+    """Lo que dejan pendiente los Zapato borrados dentro de borrado_en_bloque()."""
+    def __init__(self):
+        self.stock = Counter()    # clave de stock -> zapatos borrados
+        self.referencias = set()  # referencias_normalizadas de los borrados
+        self.lecturas = False     # hay que subir la generación de Zapato
+
+    def aplicar(self):
+        stock_service.ajustar({clave: -n for clave, n in self.stock.items()})
+        if self.referencias:
+            referencias_quitadas(self.referencias)
+        if self.lecturas:
+            incrementar(Zapato)
+
+
+def actual() -> Optional[BorradoEnBloque]:
+    """El borrado en bloque en curso en este hilo, o None."""
+    return getattr(_local, "bloque", None)
+
+
+@contextmanager
+def borrado_en_bloque():
+    """
+    Para borrar muchos Zapato de una vez (queryset.delete(), o un Pedido o
+    Cliente con sus zapatos en cascada). Django sigue avisando fila a fila,
+    pero los receivers de post_delete solo anotan cada zapato en el bloque;
+    al salir, StockResumen se ajusta con un UPDATE por clave distinta en vez
+    de uno por zapato, el autocompletado revisa de una vez las referencias
+    distintas y la generación de Zapato (services.read_cache) sube una
+    sola vez. Todo va en una transacción y los bloques anidados se
+    suman al de fuera.
+    """
+    if actual() is not None:
+        yield actual()
+        return
+    bloque = _local.bloque = BorradoEnBloque()
+    try:
+        with transaction.atomic():
+            yield bloque
+            _local.bloque = None
+            bloque.aplicar()
+    finally:
+        _local.bloque = None
@@ -0,0 +1,124 @@
+import re
+from typing import List, NamedTuple
+
+from django.db import connection
+from django.db.models import Q
+
+from app1.models import Zapato
+from .referencia import ReferenciaBuilder
+
+# Columnas indexadas y su peso en el ranking (la referencia es lo más específico)
+COLUMNAS = ("referencia", "modelo", "color", "requerimientos", "observaciones")
+PESOS = (10.0, 5.0, 3.0, 1.0, 1.0)
+TABLA_FTS = "app1_zapato_fts"
+
+# El sexo se guarda como 'H'/'M' (demasiado corto para indexar): las palabras
+# que lo nombran se convierten en un filtro
+SEXO_PALABRAS = {"h": "H", "hombre": "H", "hombres": "H", "m": "M", "mujer": "M", "mujeres": "M"}
+
+# Una sola palabra de al menos este largo también se busca dentro de la
+# referencia (p.ej. "40RHA" encuentra AP40RHA), después de los del índice
+MIN_FRAGMENTO_REFERENCIA = 3
+
+
+class ResultadoBusqueda(NamedTuple):
+    ids: List[int]     # en orden de relevancia
+    hay_mas: bool
+
+
+def _sql_sqlite():
+    cols = ", ".join(COLUMNAS)
+    nuevos = ", ".join(f"new.{c}" for c in COLUMNAS)
+    viejos = ", ".join(f"old.{c}" for c in COLUMNAS)
+    borrar = f"INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, {cols}) VALUES ('delete', old.id, {viejos});"
+    insertar = f"INSERT INTO {TABLA_FTS}(rowid, {cols}) VALUES (new.id, {nuevos});"
+    return [
+        # Tabla FTS5 de contenido externo: no duplica el texto, lo lee de app1_zapato
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} USING fts5({cols}, content='app1_zapato', "
+        f"content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ai AFTER INSERT ON app1_zapato BEGIN {insertar} END",
+        f"CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ad AFTER DELETE ON app1_zapato BEGIN {borrar} END",
+        f"CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_au AFTER UPDATE OF {cols} ON app1_zapato "
+        f"BEGIN {borrar} {insertar} END",
+    ]
+
+
+def instalar_indice(conexion=None, reconstruir: bool = False):
+    """
+    Crea el índice de texto si falta (idempotente). En SQLite es una tabla
+    FTS5 que se mantiene con triggers, así que cubre también bulk_create,
+    update() y borrados en bloque; en MySQL un índice FULLTEXT de InnoDB.
+    Se llama desde la migración y tras cada migrate: en SQLite, alterar
+    app1_zapato recrea la tabla y se lleva los triggers por delante.
+    """
+    conexion = conexion or connection
+    with conexion.cursor() as cursor:
+        if conexion.vendor == "sqlite":
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [f"{TABLA_FTS}_au"])
+            faltaba = cursor.fetchone() is None
+            for sql in _sql_sqlite():
+                cursor.execute(sql)
+            if faltaba or reconstruir:
+                cursor.execute(f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES ('rebuild')")
+        elif conexion.vendor == "mysql":
+            cursor.execute("SHOW INDEX FROM app1_zapato WHERE Key_name = 'zapato_fulltext'")
+            if not cursor.fetchall():
+                cursor.execute(f"ALTER TABLE app1_zapato ADD FULLTEXT INDEX zapato_fulltext ({', '.join(COLUMNAS)})")
+
+
+def _terminos(query: str):
+    palabras = re.findall(r"\w+", query.lower())
+    sexos = {SEXO_PALABRAS[p] for p in palabras if p in SEXO_PALABRAS}
+    return [p for p in palabras if p not in SEXO_PALABRAS], (sexos.pop() if len(sexos) == 1 else None)
+
+
+def buscar(query: str, pagina: int = 1, por_pagina: int = 24) -> ResultadoBusqueda:
+    """
+    Ids de los zapatos que coinciden con `query`, ordenados por relevancia
+    (cada palabra es un prefijo y deben aparecer todas) y paginados.
+    Si es una sola palabra, detrás van los zapatos cuya referencia la
+    contiene en cualquier posición (el índice solo encuentra prefijos).
+    Sin palabras indexables devuelve el listado ordenado por modelo.
+    """
+    terminos, sexo = _terminos(query)
+    offset = (max(pagina, 1) - 1) * por_pagina
+    limite = por_pagina + 1  # una de más para saber si hay otra página
+
+    if not terminos or connection.vendor not in ("sqlite", "mysql"):
+        qs = Zapato.objects.all()
+        for t in terminos:  # otros motores: búsqueda sin índice
+            qs = qs.filter(Q(referencia__icontains=t) | Q(modelo__icontains=t) | Q(color__icontains=t)
+                           | Q(requerimientos__icontains=t) | Q(observaciones__icontains=t))
+        if sexo:
+            qs = qs.filter(sexo=sexo)
+        ids = list(qs.order_by("modelo", "sexo", "referencia", "id").values_list("id", flat=True)[offset:offset + limite])
+        return ResultadoBusqueda(ids[:por_pagina], len(ids) > por_pagina)
+
+    filtro_sexo, params_sexo = ("AND z.sexo = %s", [sexo]) if sexo else ("", [])
+    if connection.vendor == "sqlite":
+        match = " ".join(f'"{t}"*' for t in terminos)
+        # bm25 es negativo: cuanto menor, más relevante
+        indexados = (f"SELECT z.id, bm25({TABLA_FTS}, {', '.join(map(str, PESOS))}) AS rango "
+                     f"FROM {TABLA_FTS} f JOIN app1_zapato z ON z.id = f.rowid "
+                     f"WHERE {TABLA_FTS} MATCH %s {filtro_sexo}")
+        params = [match, *params_sexo]
+        en_indice, orden, ultimo = f"z.id IN (SELECT rowid FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s)", "rango", 1e9
+        contiene = "instr(z.referencia_normalizada, %s) > 0"
+    else:
+        match = " ".join(f"+{t}*" for t in terminos)
+        coincide = f"MATCH({', '.join(COLUMNAS)}) AGAINST (%s IN BOOLEAN MODE)"
+        indexados = f"SELECT z.id, {coincide} AS rango FROM app1_zapato z WHERE {coincide} {filtro_sexo}"
+        params = [match, match, *params_sexo]  # MATCH del SELECT y del WHERE
+        en_indice, orden, ultimo = coincide, "rango DESC", -1
+        contiene = "LOCATE(%s, z.referencia_normalizada) > 0"
+    sql = indexados
+
+    if len(terminos) == 1 and len(terminos[0]) >= MIN_FRAGMENTO_REFERENCIA:
+        sql += (f" UNION ALL SELECT z.id, {ultimo} FROM app1_zapato z "
+                f"WHERE {contiene} {filtro_sexo} AND NOT {en_indice}")
+        params += [ReferenciaBuilder.normalizar(terminos[0]), *params_sexo, match]
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT id FROM ({sql}) r ORDER BY {orden}, id LIMIT %s OFFSET %s", [*params, limite, offset])
+        ids = [fila[0] for fila in cursor.fetchall()]
+    return ResultadoBusqueda(ids[:por_pagina], len(ids) > por_pagina)
@@ -0,0 +1,139 @@
+import threading
+from collections import Counter
+from typing import Callable, List, Tuple
+
+import cv2
+import numpy as np
+
+from .qr_reader import QRReader
+from .opencv_qr_reader import OpenCVQRReader
+
+
+class CascadeQRReader(QRReader):
+    """
+    Lector en cascada: primero una pasada barata (grises a tamaño nativo) y
+    solo las imágenes que fallan escalan a intentos más caros:
+    binarización, reescalado, rotación y, si la versión de OpenCV lo trae,
+    el detector alternativo basado en ArUco.
+
+    Los detectores se reutilizan por hilo (cv2.QRCodeDetector no es
+    thread-safe) y se cuenta qué etapa resolvió cada imagen en `stats`,
+    para poder ajustar la cascada con tráfico real: con `log_cada` > 0 se
+    imprime el acumulado cada `log_cada` imágenes.
+    """
+    def __init__(self, log_cada: int = 0):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.log_cada = log_cada
+        self.stats = Counter()
+        self.etapas: List[Tuple[str, Callable]] = [
+            ("gris", self._gris),
+            ("binarizado", self._binarizado),
+            ("escalado", self._escalado),
+            ("rotacion", self._rotacion),
+        ]
+        if hasattr(cv2, "QRCodeDetectorAruco"):
+            self.etapas.append(("aruco", self._aruco))
+
+    def __getstate__(self):
+        # Para poder enviarlo a los procesos del pool (threading.local/Lock no se serializan)
+        return {"log_cada": self.log_cada}
+
+    def __setstate__(self, state):
+        self.__init__(state.get("log_cada", 0))
+
+    def decode(self, image_or_bytes):
+        datos = self.decode_multi(image_or_bytes)
+        return datos[0] if datos else None
+
+    def decode_multi(self, image_or_bytes):
+        gris = self._a_gris(OpenCVQRReader._to_image(image_or_bytes))
+        for nombre, etapa in self.etapas:
+            datos = etapa(gris)
+            if datos:
+                self._contar(nombre)
+                return datos
+        self._contar("fallo")
+        return []
+
+    def estadisticas(self) -> dict:
+        """Cuántas imágenes resolvió cada etapa (y cuántas fallaron)."""
+        with self._lock:
+            return dict(self.stats)
+
+    # --- Etapas ---
+    def _gris(self, gris):
+        return self._detectar(gris)
+
+    def _binarizado(self, gris):
+        _, otsu = cv2.threshold(gris, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        datos = self._detectar(otsu)
+        if datos:
+            return datos
+        adaptativa = cv2.adaptiveThreshold(gris, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 10)
+        return self._detectar(adaptativa)
+
+    def _escalado(self, gris):
+        # Módulos muy pequeños: ampliar; imágenes enormes: reducir
+        lado = max(gris.shape[:2])
+        factores = (2.0, 3.0) if lado < 1500 else (0.5,)
+        for factor in factores:
+            interp = cv2.INTER_CUBIC if factor > 1 else cv2.INTER_AREA
+            datos = self._detectar(cv2.resize(gris, None, fx=factor, fy=factor, interpolation=interp))
+            if datos:
+                return datos
+        return []
+
+    def _rotacion(self, gris):
+        h, w = gris.shape[:2]
+        lado = int((h ** 2 + w ** 2) ** 0.5)
+        for angulo in (45, 22.5, -22.5):
+            m = cv2.getRotationMatrix2D((w / 2, h / 2), angulo, 1.0)
+            m[0, 2] += (lado - w) / 2
+            m[1, 2] += (lado - h) / 2
+            datos = self._detectar(cv2.warpAffine(gris, m, (lado, lado), borderValue=255))
+            if datos:
+                return datos
+        return []
+
+    def _aruco(self, gris):
+        return self._detectar(gris, self._detector("aruco", cv2.QRCodeDetectorAruco))
+
+    # --- Utilidades ---
+    def _detectar(self, img, detector=None) -> List[str]:
+        detector = detector or self._detector("qr", cv2.QRCodeDetector)
+        try:
+            ok, decoded, _, _ = detector.detectAndDecodeMulti(img)
+        except cv2.error:
+            ok, decoded = False, ()
+        datos = [d for d in decoded if d] if ok else []
+        if datos:
+            return datos
+        try:
+            data, _, _ = detector.detectAndDecode(img)
+        except cv2.error:
+            data = None
+        return [data] if data else []
+
+    def _detector(self, nombre, fabrica):
+        detector = getattr(self._local, nombre, None)
+        if detector is None:
+            detector = fabrica()
+            setattr(self._local, nombre, detector)
+        return detector
+
+    def _contar(self, etapa: str):
+        with self._lock:
+            self.stats[etapa] += 1
+            total = sum(self.stats.values())
+            resumen = dict(self.stats) if self.log_cada and total % self.log_cada == 0 else None
+        if resumen:
+            print(f"[CascadeQRReader] etapas tras {total} imágenes: {resumen}")
+
+    @staticmethod
+    def _a_gris(img: np.ndarray) -> np.ndarray:
+        if img.ndim == 2:
+            return img
+        if img.shape[2] == 4:
+            return cv2.cvtColor(img, cv2.COLOR_BGRA2GRAY)
+        return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
@@ -0,0 +1,78 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+
+class DecodeResultCache:
+    """
+    Caché en memoria de resultados de decodificación de archivos subidos.
+
+    La clave es la huella (SHA-256) del contenido del archivo más el reader
+    y los parámetros de lectura, así que volver a subir el mismo PDF devuelve
+    los payloads sin rasterizar ni decodificar nada. Se desaloja por:
+    - TTL: cada entrada caduca `ttl` segundos después de guardarse
+    - tamaño: como máximo `max_entradas` archivos y `max_payloads` payloads
+      en total; al pasarse se borran los usados hace más tiempo (LRU).
+    """
+    def __init__(self, ttl: int = 3600, max_entradas: int = 64, max_payloads: int = 50000):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.max_payloads = max_payloads
+        self._entradas = OrderedDict()  # clave -> (expira, payloads)
+        self._total_payloads = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def huella(archivo, *partes) -> str:
+        """
+        Hash del contenido de `archivo` (bytes o UploadedFile, leído por bloques
+        y rebobinado al terminar) junto con las `partes` extra de la clave.
+        """
+        h = hashlib.sha256()
+        for parte in partes:
+            h.update(repr(parte).encode("utf-8"))
+            h.update(b"\0")
+        if isinstance(archivo, (bytes, bytearray)):
+            h.update(archivo)
+        else:
+            bloques = archivo.chunks() if hasattr(archivo, "chunks") else iter(lambda: archivo.read(1 << 20), b"")
+            for bloque in bloques:
+                h.update(bloque)
+            archivo.seek(0)
+        return h.hexdigest()
+
+    def get(self, clave: str) -> Optional[List[dict]]:
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            expira, payloads = entrada
+            if expira < time.monotonic():
+                self._quitar(clave)
+                return None
+            self._entradas.move_to_end(clave)
+            return list(payloads)
+
+    def put(self, clave: str, payloads: List[dict]):
+        if len(payloads) > self.max_payloads:
+            return  # no cabe ni sola; no vale la pena vaciar la caché por ella
+        with self._lock:
+            if clave in self._entradas:
+                self._quitar(clave)
+            self._entradas[clave] = (time.monotonic() + self.ttl, list(payloads))
+            self._total_payloads += len(payloads)
+            self._desalojar()
+
+    def _desalojar(self):
+        ahora = time.monotonic()
+        for clave in [k for k, (expira, _) in self._entradas.items() if expira < ahora]:
+            self._quitar(clave)
+        while self._entradas and (len(self._entradas) > self.max_entradas
+                                  or self._total_payloads > self.max_payloads):
+            self._quitar(next(iter(self._entradas)))
+
+    def _quitar(self, clave: str):
+        _, payloads = self._entradas.pop(clave)
+        self._total_payloads -= len(payloads)
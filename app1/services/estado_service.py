@@ -0,0 +1,67 @@
+from typing import Dict, List, NamedTuple
+
+from django.db import transaction
+from django.dispatch import Signal
+
+# Se envía (sender=modelo) con `actualizados` y `estado_nuevo` tras cada
+# aplicar_transicion, dentro de la misma transacción: los UPDATE en bloque
+# no disparan post_save.
+transicion_aplicada = Signal()
+
+
+class ResultadoTransicion(NamedTuple):
+    actualizados: Dict[str, List[int]]   # estado de origen -> ids que cambiaron
+    sin_cambio: List[int]                # ya estaban en el estado pedido
+    rechazados: Dict[str, List[int]]     # estado de origen -> ids con transición no permitida
+
+    @property
+    def ids_actualizados(self) -> List[int]:
+        return [pk for ids in self.actualizados.values() for pk in ids]
+
+    @property
+    def ids_rechazados(self) -> List[int]:
+        return [pk for ids in self.rechazados.values() for pk in ids]
+
+
+def estados(modelo) -> List[str]:
+    """Valores de estado del modelo, en el orden de sus choices."""
+    return [valor for valor, _ in modelo.ESTADO_CHOICES]
+
+
+def puede_pasar(modelo, origen: str, destino: str) -> bool:
+    return origen == destino or destino in modelo.TRANSICIONES.get(origen, ())
+
+
+def aplicar_transicion(queryset, estado_nuevo: str, **campos) -> ResultadoTransicion:
+    """
+    Pasa a `estado_nuevo` todas las filas del queryset cuya transición esté
+    permitida en `modelo.TRANSICIONES`, por conjuntos y no fila a fila:
+    - una consulta (con bloqueo) para clasificar las filas por estado actual
+    - un UPDATE por cada estado de origen permitido
+    `campos` se aplican en el mismo UPDATE (p.ej. pedido=...).
+    Lanza ValueError si `estado_nuevo` no es un estado del modelo.
+    """
+    modelo = queryset.model
+    if estado_nuevo not in estados(modelo):
+        raise ValueError(f"Estado no válido para {modelo.__name__}: {estado_nuevo!r}")
+
+    with transaction.atomic():
+        por_estado: Dict[str, List[int]] = {}
+        for pk, estado in queryset.select_for_update().values_list("pk", "estado"):
+            por_estado.setdefault(estado, []).append(pk)
+
+        actualizados, sin_cambio, rechazados = {}, [], {}
+        for origen, ids in por_estado.items():
+            if origen == estado_nuevo and not campos:
+                sin_cambio.extend(ids)
+            elif puede_pasar(modelo, origen, estado_nuevo):
+                # El filtro por estado protege frente a cambios concurrentes
+                modelo._default_manager.filter(pk__in=ids, estado=origen).update(estado=estado_nuevo, **campos)
+                actualizados[origen] = ids
+            else:
+                rechazados[origen] = ids
+
+        if actualizados:
+            transicion_aplicada.send(sender=modelo, actualizados=actualizados, estado_nuevo=estado_nuevo)
+
+    return ResultadoTransicion(actualizados, sin_cambio, rechazados)
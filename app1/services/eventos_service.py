@@ -0,0 +1,104 @@
+from datetime import date, datetime, time
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Count, Max, Min
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from app1.models import Zapato, ZapatoEvento, ZapatoEventoDiario
+
+# Origen de cada evento
+ORIGEN_QR = 'qr'
+ORIGEN_PEDIDO = 'pedido'
+ORIGEN_CARRITO = 'carrito'
+
+
+def _empleado(usuario):
+    return usuario if getattr(usuario, 'is_authenticated', False) else None
+
+
+def registrar_transicion(resultado, estado_nuevo: str, usuario=None, origen: str = '') -> int:
+    """
+    Registra los cambios de un ResultadoTransicion de estado_service: una
+    consulta para copiar el modelo de los zapatos y un bulk_create.
+    """
+    ids = resultado.ids_actualizados
+    if not ids:
+        return 0
+    modelos = dict(Zapato.objects.filter(id__in=ids).values_list('id', 'modelo'))
+    ahora, empleado = timezone.now(), _empleado(usuario)
+    eventos = [
+        ZapatoEvento(zapato_id=zid, modelo=modelos.get(zid, ''), estado_anterior=origen_estado,
+                     estado_nuevo=estado_nuevo, empleado=empleado, origen=origen, fecha=ahora)
+        for origen_estado, zids in resultado.actualizados.items()
+        if origen_estado != estado_nuevo
+        for zid in zids
+    ]
+    ZapatoEvento.objects.bulk_create(eventos, batch_size=500)
+    return len(eventos)
+
+
+def registrar_altas(zapatos: Iterable[Zapato], usuario=None, origen: str = '') -> int:
+    ahora, empleado = timezone.now(), _empleado(usuario)
+    eventos = [
+        ZapatoEvento(zapato_id=z.id, modelo=z.modelo, estado_nuevo=z.estado,
+                     empleado=empleado, origen=origen, fecha=ahora)
+        for z in zapatos
+    ]
+    ZapatoEvento.objects.bulk_create(eventos, batch_size=500)
+    return len(eventos)
+
+
+def registrar_bajas(queryset, usuario=None, origen: str = '') -> int:
+    """Llamar antes de borrar: registra el último estado de cada zapato del queryset."""
+    ahora, empleado = timezone.now(), _empleado(usuario)
+    eventos = [
+        ZapatoEvento(zapato_id=zid, modelo=modelo, estado_anterior=estado,
+                     empleado=empleado, origen=origen, fecha=ahora)
+        for zid, modelo, estado in queryset.values_list('id', 'modelo', 'estado')
+    ]
+    ZapatoEvento.objects.bulk_create(eventos, batch_size=500)
+    return len(eventos)
+
+
+def rollup_diario(desde: Optional[date] = None) -> int:
+    """
+    Recalcula ZapatoEventoDiario desde el día `desde` (incluido) hasta hoy.
+    Sin `desde` retoma en el último día ya agregado, que pudo quedar a
+    medias, así que se puede correr tantas veces como se quiera.
+    Devuelve cuántas filas agregadas se escribieron.
+    """
+    if desde is None:
+        desde = ZapatoEventoDiario.objects.aggregate(d=Max('dia'))['d']
+    if desde is None:
+        primero = ZapatoEvento.objects.aggregate(f=Min('fecha'))['f']
+        if primero is None:
+            return 0
+        desde = timezone.localtime(primero).date()
+
+    inicio = timezone.make_aware(datetime.combine(desde, time.min))
+    grupos = (ZapatoEvento.objects.filter(fecha__gte=inicio)
+              .annotate(dia=TruncDate('fecha'))
+              .values('dia', 'modelo', 'empleado', 'estado_anterior', 'estado_nuevo')
+              .annotate(cantidad=Count('id'))
+              .order_by())
+    with transaction.atomic():
+        filas = [
+            ZapatoEventoDiario(dia=g['dia'], modelo=g['modelo'], empleado_id=g['empleado'],
+                               estado_anterior=g['estado_anterior'], estado_nuevo=g['estado_nuevo'],
+                               cantidad=g['cantidad'])
+            for g in grupos
+        ]
+        ZapatoEventoDiario.objects.filter(dia__gte=desde).delete()
+        ZapatoEventoDiario.objects.bulk_create(filas, batch_size=500)
+    return len(filas)
+
+
+def throughput(desde: date, hasta: Optional[date] = None, estado_nuevo: Optional[str] = None):
+    """Filas agregadas por día, modelo y empleado para el tablero de producción."""
+    hasta = hasta or timezone.localdate()
+    filas = ZapatoEventoDiario.objects.filter(dia__gte=desde, dia__lte=hasta)
+    if estado_nuevo is not None:
+        filas = filas.filter(estado_nuevo=estado_nuevo)
+    return filas.select_related('empleado').order_by('dia', 'modelo')
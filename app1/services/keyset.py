@@ -0,0 +1,72 @@
+import json
+import base64
+from typing import List, NamedTuple, Optional, Sequence
+
+from django.db.models import Q
+
+
+class Pagina(NamedTuple):
+    objetos: List
+    siguiente: Optional[str]   # cursor para la página siguiente (None si es la última)
+    anterior: Optional[str]    # cursor para volver a la página anterior (None si es la primera)
+
+
+class KeysetPaginator:
+    """
+    Paginación por cursor (keyset) sobre un orden total de columnas, p.ej.
+    (modelo, referencia, id). Cada página es un WHERE sobre la última fila
+    vista + LIMIT, así que cuesta lo mismo la página 1 que la 500 (no hay
+    OFFSET) y no se saltan ni repiten filas si se insertan otras mientras
+    tanto. El último campo debe ser único (normalmente el id).
+    """
+    def __init__(self, queryset, campos: Sequence[str] = ("id",), por_pagina: int = 50):
+        self.queryset = queryset
+        self.campos = tuple(campos)
+        self.por_pagina = por_pagina
+
+    def pagina(self, cursor: Optional[str] = None, atras: bool = False) -> Pagina:
+        """Página que sigue a `cursor` (o la que lo precede, con `atras`)."""
+        valores = self.decodificar(cursor) if cursor else None
+        qs = self.queryset
+        if valores is not None:
+            qs = qs.filter(self.despues_de(valores, atras))
+        orden = [f"-{c}" if atras else c for c in self.campos]
+        filas = list(qs.order_by(*orden)[:self.por_pagina + 1])
+
+        hay_mas = len(filas) > self.por_pagina
+        filas = filas[:self.por_pagina]
+        if atras:
+            filas.reverse()
+        if not filas:
+            return Pagina([], None, None)
+
+        primera, ultima = self.codificar(filas[0]), self.codificar(filas[-1])
+        if atras:
+            return Pagina(filas, ultima, primera if hay_mas else None)
+        return Pagina(filas, ultima if hay_mas else None, primera if valores is not None else None)
+
+    def despues_de(self, valores, atras: bool) -> Q:
+        # (a, b, c) > (x, y, z)  ==  a > x OR (a = x AND (b > y OR (b = y AND c > z)))
+        op = "lt" if atras else "gt"
+        condicion = None
+        for campo, valor in reversed(list(zip(self.campos, valores))):
+            mayor = Q(**{f"{campo}__{op}": valor})
+            condicion = mayor if condicion is None else mayor | (Q(**{campo: valor}) & condicion)
+        # Redundante, pero deja al motor buscar en el índice en vez de recorrerlo desde el inicio
+        primero = Q(**{f"{self.campos[0]}__{op}e": valores[0]})
+        return primero & condicion
+
+    def codificar(self, obj) -> str:
+        # obj puede ser una instancia o una fila de .values()
+        valores = [obj[campo] if isinstance(obj, dict) else getattr(obj, campo) for campo in self.campos]
+        return base64.urlsafe_b64encode(json.dumps(valores).encode("utf-8")).decode("ascii")
+
+    def decodificar(self, cursor: str) -> Optional[list]:
+        """Valores del cursor, o None si está mal formado (se vuelve al inicio)."""
+        try:
+            valores = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        except (ValueError, UnicodeError):
+            return None
+        if not isinstance(valores, list) or len(valores) != len(self.campos):
+            return None
+        return valores
@@ -0,0 +1,97 @@
+import os
+from itertools import islice
+
+from django.conf import settings
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import letter
+
+from .qr_generator import QRBatchGenerator
+from .qr_pdf import dibujar_qr_vectorial
+
+# Límites de la rejilla (columnas y filas por página)
+MIN_REJILLA, MAX_REJILLA = 1, 10
+
+
+class LabelSheetBuilder:
+    """
+    Genera hojas de etiquetas (varias por página, en rejilla) para imprimir
+    QR en lote, p.ej. para re-etiquetar la Bodega.
+
+    - Lee los zapatos del queryset por bloques (`chunk`), sin cargarlos todos.
+    - Los QR se calculan con QRBatchGenerator (pool de procesos por bloque)
+      y se dibujan como vectores.
+    """
+    def __init__(self, generador: QRBatchGenerator, columnas: int = 3, filas: int = 10,
+                 pagesize=letter, margen: float = 36, chunk: int = 1000):
+        self.generador = generador
+        self.columnas = min(max(int(columnas), MIN_REJILLA), MAX_REJILLA)
+        self.filas = min(max(int(filas), MIN_REJILLA), MAX_REJILLA)
+        self.pagesize = pagesize
+        self.margen = margen
+        self.chunk = chunk
+
+        ancho, alto = pagesize
+        self.celda_w = (ancho - 2 * margen) / self.columnas
+        self.celda_h = (alto - 2 * margen) / self.filas
+        self.qr_size = min(self.celda_h, self.celda_w / 2) - 6
+
+    def build_file(self, zapatos, path) -> int:
+        """Escribe el PDF en `path` y devuelve cuántas etiquetas tiene."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        total = self.build(zapatos, tmp_path)
+        os.replace(tmp_path, path)
+        return total
+
+    def build(self, zapatos, destino) -> int:
+        """Escribe el PDF en `destino` (ruta o archivo abierto en binario)."""
+        c = canvas.Canvas(destino, pagesize=self.pagesize, pageCompression=1)
+        por_pagina = self.columnas * self.filas
+        total = 0
+
+        iterador = zapatos.iterator(chunk_size=self.chunk) if hasattr(zapatos, 'iterator') else iter(zapatos)
+        while True:
+            lote = list(islice(iterador, self.chunk))
+            if not lote:
+                break
+            for z, matriz in zip(lote, self.generador.matrices(lote)):
+                if total and total % por_pagina == 0:
+                    c.showPage()
+                self._dibujar_etiqueta(c, total % por_pagina, z, matriz)
+                total += 1
+
+        c.save()
+        return total
+
+    def _dibujar_etiqueta(self, c, posicion, zapato, matriz):
+        fila, columna = divmod(posicion, self.columnas)
+        _, alto = self.pagesize
+        x = self.margen + columna * self.celda_w
+        y = alto - self.margen - (fila + 1) * self.celda_h
+
+        qr_y = y + (self.celda_h - self.qr_size) / 2
+        dibujar_qr_vectorial(c, matriz, x + 3, qr_y, self.qr_size)
+
+        texto_x = x + self.qr_size + 8
+        c.setFont("Helvetica-Bold", 9)
+        c.drawString(texto_x, y + self.celda_h - 18, f"{zapato.referencia}")
+        c.setFont("Helvetica", 8)
+        c.drawString(texto_x, y + self.celda_h - 30, f"{zapato.modelo} {zapato.sexo} T{zapato.talla}")
+        c.drawString(texto_x, y + self.celda_h - 41, f"{zapato.color}")
+        c.drawString(texto_x, y + self.celda_h - 52, f"Id: {zapato.id}")
+
+
+def get_label_sheet_builder(columnas=None, filas=None) -> LabelSheetBuilder:
+    """
+    Builder con la configuración de settings (rejilla, workers, formato del
+    payload). Las etiquetas se dibujan como vectores: no usan la caché de PNG.
+    """
+    return LabelSheetBuilder(
+        QRBatchGenerator(
+            workers=getattr(settings, "QR_BATCH_WORKERS", None),
+            min_paralelo=getattr(settings, "QR_BATCH_MIN_PARALLEL", 20),
+            formato=getattr(settings, "QR_PAYLOAD_FORMAT", "json"),
+        ),
+        columnas=columnas or getattr(settings, "LABEL_SHEET_COLUMNS", 3),
+        filas=filas or getattr(settings, "LABEL_SHEET_ROWS", 10),
+    )
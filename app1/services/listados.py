@@ -0,0 +1,58 @@
+from typing import List, Sequence
+
+from django.db.models import Case, CharField, Q, Value, When
+from django.db.models.functions import Concat
+
+from app1.models import Zapato
+
+# Columnas de cada listado: solo lo que pinta su plantilla (nunca los
+# TextField de requerimientos/observaciones)
+CAMPOS_BUSQUEDA = ("id", "modelo", "referencia", "talla", "color", "sexo")
+CAMPOS_STOCK = ("id", "modelo", "referencia", "talla", "color", "sexo", "estado")
+CAMPOS_PEDIDO = ("id", "modelo", "talla", "color", "sexo", "estado")
+
+
+def imagen_categoria():
+    """
+    La imagen del zapato o, si no tiene, la de su categoría
+    ("images/<modelo><H|M>1.png"), calculada por la base de datos.
+    """
+    return Case(
+        When(Q(imagen__isnull=True) | Q(imagen=""), then=Concat(
+            Value("images/"), "modelo",
+            Case(When(sexo="H", then=Value("H")), default=Value("M")),
+            Value("1.png"),
+            output_field=CharField(),
+        )),
+        default="imagen",
+        output_field=CharField(),
+    )
+
+
+def sexo_display():
+    """Equivalente en SQL de get_sexo_display (cae en el valor guardado)."""
+    return Case(
+        *[When(sexo=valor, then=Value(etiqueta)) for valor, etiqueta in Zapato.GENERO_CHOICES],
+        default="sexo",
+        output_field=CharField(),
+    )
+
+
+def filas(queryset, campos: Sequence[str], **anotaciones):
+    """Diccionarios con solo `campos` (+ anotaciones), sin instanciar modelos."""
+    return queryset.annotate(**anotaciones).values(*campos, *anotaciones)
+
+
+def busqueda(ids: Sequence[int]) -> List[dict]:
+    """Filas de la búsqueda para esos ids, en el mismo orden (el de relevancia)."""
+    por_id = {f["id"]: f for f in filas(Zapato.objects.filter(id__in=ids), CAMPOS_BUSQUEDA,
+                                         imagen_categoria=imagen_categoria())}
+    return [por_id[i] for i in ids if i in por_id]
+
+
+def stock(queryset):
+    return filas(queryset, CAMPOS_STOCK, sexo_display=sexo_display())
+
+
+def pedido(pedido_obj):
+    return filas(Zapato.objects.filter(pedido=pedido_obj).order_by("id"), CAMPOS_PEDIDO)
@@ -8,6 +8,33 @@ class OpenCVQRReader(QRReader):
         """
         Recibe una imagen como numpy array (BGR) o bytes y devuelve un diccionario con los datos del QR.
         """
+        img = self._to_image(image_or_bytes)
+        detector = cv2.QRCodeDetector()
+        data, points, _ = detector.detectAndDecode(img)
+
+        if not data:
+            return None
+
+        return data
+
+    def decode_multi(self, image_or_bytes):
+        """
+        Devuelve la lista de contenidos de todos los QR de la imagen
+        (una sola pasada del detector). Si no detecta ninguno con el modo
+        múltiple, intenta una vez el modo simple.
+        """
+        img = self._to_image(image_or_bytes)
+        detector = cv2.QRCodeDetector()
+        ok, decoded, points, _ = detector.detectAndDecodeMulti(img)
+        datos = [d for d in decoded if d] if ok else []
+        if datos:
+            return datos
+
+        data, points, _ = detector.detectAndDecode(img)
+        return [data] if data else []
+
+    @staticmethod
+    def _to_image(image_or_bytes):
         # Convertir a imagen numpy si viene en bytes
         if isinstance(image_or_bytes, bytes):
             nparr = np.frombuffer(image_or_bytes, np.uint8)
@@ -18,11 +45,4 @@ class OpenCVQRReader(QRReader):
             img = image_or_bytes
         else:
             raise TypeError(f"Tipo no soportado en decode(): {type(image_or_bytes)}")
-
-        detector = cv2.QRCodeDetector()
-        data, points, _ = detector.detectAndDecode(img)
-
-        if not data:
-            return None
-
-        return data
+        return img
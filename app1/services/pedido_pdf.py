@@ -0,0 +1,86 @@
+import os
+from io import BytesIO
+
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import letter
+
+from .qr_pdf import dibujar_qr_vectorial
+
+# Maquetación del detalle: y inicial (primera página y siguientes), y mínima
+# antes de saltar de página y alto de cada zapato, en puntos
+Y_PRIMERA_PAGINA, Y_PAGINA, Y_MINIMA, ALTO_ZAPATO = 650, 750, 100, 120
+
+
+class PedidoPDFBuilder:
+    """
+    Pequeño helper para construir el PDF del pedido (Facade/Utility).
+    modo_qr: "imagen" dibuja el PNG de info['qr_path'];
+             "vector" dibuja info['qr_matriz'] como rectángulos (sin PNG).
+    """
+    def __init__(self, pedido, cliente, zapato_info, modo_qr="vector"):
+        self.pedido = pedido
+        self.cliente = cliente
+        self.zapato_info = zapato_info
+        self.modo_qr = modo_qr
+
+    def draw_qr(self, c, info, x, y, size):
+        if self.modo_qr == "vector":
+            dibujar_qr_vectorial(c, info['qr_matriz'], x, y, size)
+        else:
+            c.drawImage(info['qr_path'], x, y, width=size, height=size)
+
+    def build_pdf_bytesio(self):
+        buffer = BytesIO()
+        c = canvas.Canvas(buffer, pagesize=letter)
+        self.draw(c)
+        c.save()
+        buffer.seek(0)
+        return buffer
+
+    def build_pdf_file(self, path):
+        """
+        Escribe el PDF directamente en `path` (vía un temporal), sin pasar
+        por un BytesIO. Solo la salida va a disco: reportlab guarda cada
+        página terminada (comprimida) hasta save(), así que la memoria
+        sigue creciendo con el número de zapatos del pedido. zapato_info
+        puede ser un generador para no tener además todos sus datos a la vez.
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        c = canvas.Canvas(tmp_path, pagesize=letter, pageCompression=1)
+        self.draw(c)
+        c.save()
+        os.replace(tmp_path, path)  # nunca se sirve un PDF a medio escribir
+        return path
+
+    @staticmethod
+    def paginas(items):
+        """Reparte `items` en páginas tal como los dibuja `draw`: listas de (item, y)."""
+        pagina, y = [], Y_PRIMERA_PAGINA
+        for item in items:
+            if y < Y_MINIMA:
+                yield pagina
+                pagina, y = [], Y_PAGINA
+            pagina.append((item, y))
+            y -= ALTO_ZAPATO
+        yield pagina
+
+    def draw(self, c):
+        # Título y cabecera
+        c.setFont("Helvetica-Bold", 16)
+        c.drawString(200, 750, f"Pedido #{self.pedido.id}")
+        c.setFont("Helvetica", 12)
+        c.drawString(50, 730, f"Cliente: {self.cliente.nombre}")
+        c.drawString(50, 710, f"Fecha: {self.pedido.fecha_creacion.strftime('%Y-%m-%d %H:%M:%S')}")
+        c.drawString(50, 690, f"Observaciones: {self.pedido.observaciones}")
+
+        # Detalle zapatos
+        for n, pagina in enumerate(self.paginas(self.zapato_info)):
+            if n:
+                c.showPage()
+            for info, y in pagina:
+                c.drawString(50, y,        f"Id: {info['id']}")
+                c.drawString(50, y - 20,   f"Referencia: {info['referencia']}")
+                c.drawString(50, y - 40,   f"Modelo: {info['modelo']}")
+                c.drawString(50, y - 60,   f"Talla: {info['talla']}")
+                self.draw_qr(c, info, 400, y - 70, 100)
@@ -0,0 +1,195 @@
+import time
+import inspect
+import pkgutil
+import importlib
+import tracemalloc
+import sys
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Set
+
+import cv2
+import numpy as np
+import fitz  # PyMuPDF
+
+from .qr_reader import QRReader
+from .qr_service import QRService
+from .qr_generator import generar_codigo_qr, matriz_qr, serializar_payload
+from .qr_payload import FORMATO_JSON, FORMATO_COMPACTO
+
+
+class MuestraQR(NamedTuple):
+    nombre: str            # p.ej. "compact/rotacion_15"
+    degradacion: str       # familia de la degradación, para agrupar el recall
+    imagen: np.ndarray     # BGR
+    esperados: Set[int]    # ids de zapato que deberían leerse
+
+
+# -----------------------------
+# Corpus sintético
+# -----------------------------
+def _a_bgr(pil_img) -> np.ndarray:
+    return cv2.cvtColor(np.array(pil_img.convert("RGB"), dtype=np.uint8), cv2.COLOR_RGB2BGR)
+
+
+def _rotar(img, angulo):
+    h, w = img.shape[:2]
+    m = cv2.getRotationMatrix2D((w / 2, h / 2), angulo, 1.0)
+    cos, sin = abs(m[0, 0]), abs(m[0, 1])
+    nw, nh = int(h * sin + w * cos), int(h * cos + w * sin)
+    m[0, 2] += nw / 2 - w / 2
+    m[1, 2] += nh / 2 - h / 2
+    return cv2.warpAffine(img, m, (nw, nh), borderValue=(255, 255, 255))
+
+
+def _jpeg(img, calidad):
+    ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, calidad])
+    return cv2.imdecode(buf, cv2.IMREAD_COLOR)
+
+
+def _escalar(img, factor):
+    return cv2.resize(img, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+
+
+DEGRADACIONES = {
+    "original": [("original", lambda img: img)],
+    "rotacion": [(f"rotacion_{a}", lambda img, a=a: _rotar(img, a)) for a in (5, 15, 45, 90)],
+    "blur": [(f"blur_{k}", lambda img, k=k: cv2.GaussianBlur(img, (k, k), 0)) for k in (3, 5, 7)],
+    "jpeg": [(f"jpeg_{q}", lambda img, q=q: _jpeg(img, q)) for q in (30, 15)],
+    "dpi": [(f"escala_{f}", lambda img, f=f: _escalar(img, f)) for f in (0.35, 0.5, 1.5)],
+}
+
+
+def construir_corpus(zapatos, pdf_builder, pedido, cliente,
+                     formatos=(FORMATO_JSON, FORMATO_COMPACTO), dpis_pagina=(100, 150, 200)) -> List[MuestraQR]:
+    """
+    Etiquetas individuales (generar_codigo_qr) con cada degradación, más las
+    páginas del PDF de pedido (varias etiquetas por página) a varios dpi.
+    `pdf_builder` es la clase PedidoPDFBuilder (o una compatible).
+    """
+    corpus = []
+    for formato in formatos:
+        for z in zapatos:
+            base = _a_bgr(generar_codigo_qr(z, formato).get_image())
+            for familia, variantes in DEGRADACIONES.items():
+                for nombre, degradar in variantes:
+                    corpus.append(MuestraQR(f"{formato}/{nombre}", familia, degradar(base), {z.id}))
+
+        info = [
+            {'id': z.id, 'referencia': z.referencia, 'modelo': z.modelo, 'talla': z.talla,
+             'qr_path': None, 'qr_matriz': matriz_qr(serializar_payload(z, formato))}
+            for z in zapatos
+        ]
+        pdf_bytes = pdf_builder(pedido, cliente, info, modo_qr="vector").build_pdf_bytesio().getvalue()
+        pdf = fitz.open(stream=pdf_bytes, filetype="pdf")
+        ids_pagina = [[item['id'] for item, _ in pagina] for pagina in pdf_builder.paginas(info)]
+        for dpi in dpis_pagina:
+            for page, ids in zip(pdf, ids_pagina):
+                pix = page.get_pixmap(dpi=dpi)
+                rgb = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+                corpus.append(MuestraQR(f"{formato}/pagina_{dpi}dpi", "multi", cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR), set(ids)))
+    return corpus
+
+
+# -----------------------------
+# Ejecución
+# -----------------------------
+def readers_registrados() -> Dict[str, type]:
+    """Subclases concretas de QRReader definidas en app1.services."""
+    from app1 import services
+    for modulo in pkgutil.iter_modules(services.__path__):
+        importlib.import_module(f"{services.__name__}.{modulo.name}")
+
+    encontrados, pendientes = {}, list(QRReader.__subclasses__())
+    while pendientes:
+        cls = pendientes.pop()
+        pendientes.extend(cls.__subclasses__())
+        if not inspect.isabstract(cls):
+            encontrados[f"{cls.__module__}.{cls.__qualname__}"] = cls
+    return encontrados
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0.0
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def medir_reader(reader: QRReader, corpus: List[MuestraQR]) -> dict:
+    """
+    Pasa el corpus por reader.decode_multi y mide throughput, latencias,
+    memoria pico (asignaciones de Python/numpy vistas por tracemalloc) y recall.
+    La memoria se mide en una segunda pasada: tracemalloc encarece cada
+    asignación y falsearía las latencias.
+    """
+    parser = QRService(reader)
+    latencias = []
+    leidos_por_familia, esperados_por_familia = {}, {}
+
+    inicio = time.perf_counter()
+    for muestra in corpus:
+        t0 = time.perf_counter()
+        datos = reader.decode_multi(muestra.imagen)
+        latencias.append(time.perf_counter() - t0)
+
+        ids = {p.get("id") for p in map(parser.parse_data, datos) if isinstance(p, dict)}
+        leidos_por_familia[muestra.degradacion] = leidos_por_familia.get(muestra.degradacion, 0) + len(ids & muestra.esperados)
+        esperados_por_familia[muestra.degradacion] = esperados_por_familia.get(muestra.degradacion, 0) + len(muestra.esperados)
+    total = time.perf_counter() - inicio
+    etapas = reader.estadisticas() if hasattr(reader, "estadisticas") else None
+
+    tracemalloc.start()
+    for muestra in corpus:
+        reader.decode_multi(muestra.imagen)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    leidos, esperados = sum(leidos_por_familia.values()), sum(esperados_por_familia.values())
+    resultado = {
+        "imagenes": len(corpus),
+        "throughput_img_s": round(len(corpus) / total, 2) if total else None,
+        "latencia_p50_ms": round(_percentil(latencias, 50) * 1000, 2),
+        "latencia_p95_ms": round(_percentil(latencias, 95) * 1000, 2),
+        "memoria_pico_kb": round(pico / 1024, 1),
+        "recall": round(leidos / esperados, 4) if esperados else None,
+        "recall_por_degradacion": {
+            familia: round(leidos_por_familia[familia] / esperados_por_familia[familia], 4)
+            for familia in sorted(esperados_por_familia)
+        },
+    }
+    if etapas is not None:
+        resultado["etapas"] = etapas  # readers en cascada: qué etapa resolvió cada imagen
+    return resultado
+
+
+def _rss_max_kb():
+    try:
+        import resource  # no existe en Windows
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss  # macOS lo da en bytes
+
+
+def ejecutar_benchmark(readers: Dict[str, type], corpus: List[MuestraQR]) -> dict:
+    """Resultado completo en un dict listo para serializar a JSON."""
+    resultados = []
+    for nombre, cls in readers.items():
+        try:
+            reader = cls()
+        except TypeError as e:
+            resultados.append({"reader": nombre, "error": f"No se pudo instanciar: {e}"})
+            continue
+        resultados.append({"reader": nombre, **medir_reader(reader, corpus)})
+
+    muestras_por_familia = {}
+    for muestra in corpus:
+        muestras_por_familia[muestra.degradacion] = muestras_por_familia.get(muestra.degradacion, 0) + 1
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "opencv": cv2.__version__,
+        # tracemalloc no ve la memoria nativa de OpenCV; el RSS máximo del proceso sí
+        "proceso_rss_max_kb": _rss_max_kb(),
+        "corpus": {"imagenes": len(corpus), "por_degradacion": muestras_por_familia},
+        "readers": resultados,
+    }
@@ -0,0 +1,132 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+
+class QRCache:
+    """
+    Caché de imágenes QR direccionada por contenido.
+
+    La clave es un hash del payload serializado más los parámetros del
+    codificador, así que un QR solo se vuelve a generar si cambia lo que
+    lleva dentro. Tiene dos niveles:
+    - memoria: LRU con los PNG más recientes (máximo `max_memoria` entradas)
+    - disco: un PNG por clave en `directorio`, limitado a `max_bytes_disco`;
+      al pasarse del límite se borran los archivos más antiguos.
+    """
+    def __init__(self, directorio: str, max_memoria: int = 1024, max_bytes_disco: int = 64 * 1024 * 1024):
+        self.directorio = directorio
+        self.max_memoria = max_memoria
+        self.max_bytes_disco = max_bytes_disco
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes_disco = None  # se mide la primera vez que hace falta
+
+    @staticmethod
+    def clave(data, params: dict) -> str:
+        contenido = json.dumps([data, params], sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+    def ruta(self, clave: str) -> str:
+        return os.path.join(self.directorio, f"{clave}.png")
+
+    def get(self, clave: str) -> Optional[str]:
+        """Devuelve la ruta del PNG cacheado o None si no existe en ningún nivel."""
+        path = self.ruta(clave)
+        with self._lock:
+            png = self._memoria.get(clave)
+            if png is not None:
+                self._memoria.move_to_end(clave)
+
+        if png is not None:
+            # Otro proceso pudo haberlo desalojado del disco: se repone sin recodificar
+            if not os.path.exists(path):
+                self._escribir(path, png)
+            return path
+
+        try:
+            with open(path, 'rb') as f:
+                png = f.read()
+        except FileNotFoundError:
+            return None
+        os.utime(path)  # marca el uso para que el desalojo respete los más usados
+        self._recordar(clave, png)
+        return path
+
+    def put(self, clave: str, png: bytes) -> str:
+        path = self.ruta(clave)
+        self._escribir(path, png)
+        self._recordar(clave, png)
+        return path
+
+    def evict(self, protegidas: Iterable[str] = ()) -> int:
+        """
+        Si el disco supera el límite, borra los PNG más antiguos hasta quedar
+        en el 90% del límite. Las claves `protegidas` (p.ej. las del PDF que se
+        está construyendo) nunca se borran. Devuelve cuántos archivos borró.
+        """
+        if self._bytes_disco is None:
+            self._bytes_disco = self._medir_disco()
+        if self._bytes_disco <= self.max_bytes_disco:
+            return 0
+
+        protegidas = set(protegidas)
+        entradas = []
+        total = 0
+        for entry in os.scandir(self.directorio):
+            if entry.is_file() and entry.name.endswith('.png'):
+                st = entry.stat()
+                entradas.append((st.st_mtime, st.st_size, entry.name[:-4]))
+                total += st.st_size
+        entradas.sort()
+
+        objetivo = int(self.max_bytes_disco * 0.9)
+        borrados = 0
+        for _, size, clave in entradas:
+            if total <= objetivo:
+                break
+            if clave in protegidas:
+                continue
+            try:
+                os.remove(self.ruta(clave))
+            except FileNotFoundError:
+                pass
+            total -= size
+            borrados += 1
+            with self._lock:
+                self._memoria.pop(clave, None)
+
+        self._bytes_disco = total
+        return borrados
+
+    def _recordar(self, clave: str, png: bytes):
+        with self._lock:
+            self._memoria[clave] = png
+            self._memoria.move_to_end(clave)
+            while len(self._memoria) > self.max_memoria:
+                self._memoria.popitem(last=False)
+
+    def _escribir(self, path: str, png: bytes):
+        os.makedirs(self.directorio, exist_ok=True)
+        try:
+            anterior = os.path.getsize(path)  # si se sobrescribe, no cuenta dos veces
+        except FileNotFoundError:
+            anterior = 0
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(png)
+        os.replace(tmp, path)  # escritura atómica: nunca se lee un PNG a medias
+        if self._bytes_disco is not None:
+            self._bytes_disco += len(png) - anterior
+
+    def _medir_disco(self) -> int:
+        if not os.path.isdir(self.directorio):
+            return 0
+        return sum(
+            entry.stat().st_size
+            for entry in os.scandir(self.directorio)
+            if entry.is_file() and entry.name.endswith('.png')
+        )
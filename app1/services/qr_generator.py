@@ -0,0 +1,181 @@
+import os
+import json
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
+
+import qrcode
+from qrcode.util import QRData, MODE_ALPHA_NUM
+
+from .qr_cache import QRCache
+from .qr_payload import FORMATO_JSON, FORMATO_COMPACTO, codificar_compacto, es_compacto
+
+QR_DIRECTORY = 'qr_codes/'  # Directorio donde se guardarán los QR
+
+# Parámetros del codificador; forman parte de la clave de la caché
+QR_PARAMS = {
+    'box_size': 10,
+    'border': 4,
+}
+# El compacto cabe en versión 1 incluso con corrección M (más tolerante a escaneos malos)
+ERROR_CORRECTION = {
+    FORMATO_JSON: 'L',
+    FORMATO_COMPACTO: 'M',
+}
+
+
+def payload_zapato(zapato) -> dict:
+    """Datos del zapato que viajan dentro del QR."""
+    return {
+        'id': zapato.id,
+        'referencia': zapato.referencia,
+        'modelo': zapato.modelo,
+        'talla': zapato.talla,
+        'sexo': zapato.sexo,
+        'color': zapato.color,
+        'requerimientos': zapato.requerimientos,
+        'observaciones': zapato.observaciones,
+        'estado': zapato.estado,
+        # 'pedido': zapato.pedido,
+    }
+
+
+def serializar_payload(zapato, formato: str = FORMATO_JSON) -> str:
+    """Texto que se codifica en el QR según el formato elegido."""
+    if formato == FORMATO_COMPACTO:
+        return codificar_compacto(zapato.id)
+    return json.dumps(payload_zapato(zapato), ensure_ascii=False)
+
+
+def params_codificador(texto: str) -> dict:
+    formato = FORMATO_COMPACTO if es_compacto(texto) else FORMATO_JSON
+    return {**QR_PARAMS, 'error_correction': ERROR_CORRECTION[formato]}
+
+
+def _construir_qr(texto: str) -> qrcode.QRCode:
+    params = params_codificador(texto)
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=getattr(qrcode.constants, f"ERROR_CORRECT_{params['error_correction']}"),
+        box_size=params['box_size'],
+        border=params['border'],
+    )
+    if es_compacto(texto):
+        # Forzamos modo alfanumérico: ~5.5 bits por carácter en vez de 8
+        qr.add_data(QRData(texto.encode('ascii'), mode=MODE_ALPHA_NUM))
+    else:
+        qr.add_data(texto)
+    qr.make(fit=True)
+    return qr
+
+
+def codificar_texto(texto: str):
+    """Codifica el texto de un payload como imagen QR."""
+    return _construir_qr(texto).make_image(fill_color="black", back_color="white")
+
+
+def matriz_qr(texto: str) -> List[List[bool]]:
+    """Matriz de módulos del QR (True = oscuro), incluyendo el borde."""
+    return _construir_qr(texto).get_matrix()
+
+
+def codificar_payload(data: dict):
+    """Codifica un payload (dict) como imagen QR."""
+    return codificar_texto(json.dumps(data, ensure_ascii=False))  # Convierte los datos a JSON y los agrega al QR
+
+
+def guardar_qr_id(zapato_id, img) -> str:
+    os.makedirs(QR_DIRECTORY, exist_ok=True)  # Crea el directorio si no existe
+    qr_path = os.path.join(QR_DIRECTORY, f"zapato_{zapato_id}.png")
+    img.save(qr_path)
+    return qr_path
+
+
+def generar_codigo_qr(zapato, formato: str = FORMATO_JSON):
+    """
+    Genera un código QR para un zapato y devuelve la imagen.
+    """
+    return codificar_texto(serializar_payload(zapato, formato))
+
+
+def guardar_qr(zapato, img):
+    """
+    Guarda la imagen del QR en un directorio específico.
+    """
+    return guardar_qr_id(zapato.id, img)
+
+
+def _generar_y_guardar(item) -> str:
+    # Se ejecuta en los procesos del pool: solo recibe datos planos (picklables)
+    zapato_id, texto = item
+    return guardar_qr_id(zapato_id, codificar_texto(texto))
+
+
+def _codificar_png(texto: str) -> bytes:
+    # Igual que el anterior pero devuelve el PNG en memoria (lo guarda la caché)
+    buffer = BytesIO()
+    codificar_texto(texto).save(buffer)
+    return buffer.getvalue()
+
+
+class QRBatchGenerator:
+    """
+    Genera y guarda los QR de una lista de zapatos repartiendo el trabajo
+    en un pool de procesos. Devuelve las rutas en el mismo orden de entrada.
+    Con pocos zapatos (o workers <= 1) trabaja en serie.
+
+    Si recibe una QRCache, solo se codifican los payloads que no estén en
+    ella y las rutas devueltas apuntan a los PNG de la caché.
+    """
+    def __init__(self, workers: Optional[int] = None, min_paralelo: int = 20,
+                 cache: Optional[QRCache] = None, formato: str = FORMATO_JSON):
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.min_paralelo = min_paralelo
+        self.cache = cache
+        self.formato = formato
+
+    def generate(self, zapatos) -> List[str]:
+        zapatos = list(zapatos)
+        textos = [serializar_payload(z, self.formato) for z in zapatos]
+        if self.cache is None:
+            return self._map(_generar_y_guardar, [(z.id, t) for z, t in zip(zapatos, textos)])
+
+        claves = [QRCache.clave(t, params_codificador(t)) for t in textos]
+        paths = [self.cache.get(k) for k in claves]
+
+        pendientes = {}
+        for clave, texto, path in zip(claves, textos, paths):
+            if path is None:
+                pendientes.setdefault(clave, texto)
+
+        if pendientes:
+            pngs = self._map(_codificar_png, list(pendientes.values()))
+            nuevos = {clave: self.cache.put(clave, png) for clave, png in zip(pendientes, pngs)}
+            paths = [path or nuevos[clave] for clave, path in zip(claves, paths)]
+
+        self.cache.evict(protegidas=claves)
+        return paths
+
+    def matrices(self, zapatos) -> List[List[List[bool]]]:
+        """Como generate() pero devuelve las matrices (para dibujar en vectorial)."""
+        return self.matrices_textos([serializar_payload(z, self.formato) for z in zapatos])
+
+    def matrices_textos(self, textos) -> List[List[List[bool]]]:
+        """Matrices de payloads ya serializados, en el mismo orden."""
+        return self._map(matriz_qr, list(textos))
+
+    def _map(self, func, items) -> list:
+        if self.workers <= 1 or len(items) < self.min_paralelo:
+            return [func(item) for item in items]
+        try:
+            return self._paralelo(func, items)
+        except (BrokenProcessPool, OSError) as e:
+            print(f"[QRBatchGenerator] Pool no disponible, generando en serie: {e}")
+            return [func(item) for item in items]
+
+    def _paralelo(self, func, items) -> list:
+        workers = min(self.workers, len(items))
+        chunksize = max(1, len(items) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(func, items, chunksize=chunksize))
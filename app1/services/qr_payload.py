@@ -0,0 +1,46 @@
+import re
+import zlib
+from typing import Optional
+
+# Formatos de payload que se pueden imprimir en las etiquetas
+FORMATO_JSON = 'json'          # legado: el zapato completo en JSON
+FORMATO_COMPACTO = 'compact'   # solo id + checksum, en modo alfanumérico
+
+# Formato compacto versionado: "Z1:<id>:<checksum>".
+# Solo usa caracteres del modo alfanumérico de QR (0-9, A-Z, ':'),
+# así el código queda en versión 1-2 aunque el id crezca.
+VERSION_COMPACTO = 'Z1'
+_COMPACTO_RE = re.compile(r'^(Z\d+):(\d+):([0-9A-Z]{4})$')
+_BASE36 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+def checksum_compacto(zapato_id, version: str = VERSION_COMPACTO) -> str:
+    """Checksum corto (4 caracteres base36) para detectar lecturas erróneas."""
+    valor = zlib.crc32(f"{version}:{zapato_id}".encode('ascii')) % (36 ** 4)
+    digitos = []
+    for _ in range(4):
+        valor, resto = divmod(valor, 36)
+        digitos.append(_BASE36[resto])
+    return ''.join(reversed(digitos))
+
+
+def codificar_compacto(zapato_id) -> str:
+    return f"{VERSION_COMPACTO}:{int(zapato_id)}:{checksum_compacto(int(zapato_id))}"
+
+
+def es_compacto(texto: str) -> bool:
+    return bool(_COMPACTO_RE.match(texto or ''))
+
+
+def decodificar_compacto(texto: str) -> Optional[dict]:
+    """
+    Devuelve {'id': ..., 'formato': 'Z1'} si el texto es un payload compacto
+    válido, o None si no lo es o si el checksum no coincide.
+    """
+    match = _COMPACTO_RE.match((texto or '').strip())
+    if not match:
+        return None
+    version, zapato_id, checksum = match.groups()
+    if version != VERSION_COMPACTO or checksum != checksum_compacto(zapato_id, version):
+        return None
+    return {'id': int(zapato_id), 'formato': version}
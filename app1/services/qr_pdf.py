@@ -0,0 +1,28 @@
+from typing import List
+
+
+def dibujar_qr_vectorial(c, matriz: List[List[bool]], x: float, y: float, size: float):
+    """
+    Dibuja un QR en el canvas de reportlab como rectángulos vectoriales.
+    (x, y) es la esquina inferior izquierda y `size` el lado en puntos.
+    Los módulos oscuros contiguos de cada fila se unen en un solo rectángulo
+    y todo el código va en un único path, así el PDF queda pequeño.
+    """
+    n = len(matriz)
+    modulo = size / n
+    path = c.beginPath()
+    for fila, modulos in enumerate(matriz):
+        y_fila = y + size - (fila + 1) * modulo
+        col = 0
+        while col < n:
+            if not modulos[col]:
+                col += 1
+                continue
+            inicio = col
+            while col < n and modulos[col]:
+                col += 1
+            path.rect(x + inicio * modulo, y_fila, (col - inicio) * modulo, modulo)
+    c.saveState()
+    c.setFillColorRGB(0, 0, 0)
+    c.drawPath(path, stroke=0, fill=1)
+    c.restoreState()
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, List
 
 class QRReader(ABC):
     """Abstracción para lectores de códigos QR."""
@@ -8,7 +8,17 @@ class QRReader(ABC):
     def decode(self, image_or_bytes) -> Any:
         """
         Decodifica un QR a partir de una imagen o bytes.
+        La imagen puede venir en BGR o en escala de grises (array 2D).
         Retorna el contenido como string, o None si no hay QR válido.
         """
         raise NotImplementedError
 
+    def decode_multi(self, image_or_bytes) -> List[Any]:
+        """
+        Decodifica todos los QR de la imagen.
+        Por defecto delega en decode(); los readers que sepan detectar
+        varios códigos a la vez deberían sobrescribirlo.
+        """
+        data = self.decode(image_or_bytes)
+        return [data] if data else []
+
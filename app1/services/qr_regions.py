@@ -0,0 +1,30 @@
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+
+def localizar_regiones_qr(gris: np.ndarray, min_lado: int) -> List[Tuple[int, int, int, int]]:
+    """
+    Busca zonas candidatas a QR en una imagen en escala de grises de baja
+    resolución. No decodifica nada: binariza, une los módulos con un cierre
+    morfológico y se queda con las manchas aproximadamente cuadradas, de
+    tamaño suficiente y con densidad de negro propia de un QR.
+    Devuelve bounding boxes (x, y, w, h) ordenadas de arriba a abajo.
+    """
+    _, bw = cv2.threshold(gris, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
+    cerrada = cv2.morphologyEx(bw, cv2.MORPH_CLOSE, kernel)
+    contornos, _ = cv2.findContours(cerrada, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    regiones = []
+    for contorno in contornos:
+        x, y, w, h = cv2.boundingRect(contorno)
+        if min(w, h) < min_lado or not 0.75 <= w / h <= 1.33:
+            continue
+        densidad = bw[y:y + h, x:x + w].mean() / 255
+        if not 0.25 <= densidad <= 0.75:
+            continue
+        regiones.append((x, y, w, h))
+    regiones.sort(key=lambda r: (r[1], r[0]))
+    return regiones
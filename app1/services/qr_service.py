@@ -1,21 +1,71 @@
+import io
+import os
+import copy
 import json
+import tempfile
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from .qr_reader import QRReader
-from typing import Any, List
+from .qr_payload import decodificar_compacto, es_compacto
+from .qr_regions import localizar_regiones_qr
+from .decode_cache import DecodeResultCache
+from typing import Any, Iterator, List, Optional
+import cv2
 import numpy as np
 from PIL import Image
 import fitz  # PyMuPDF
 
 class QRService:
     """Servicio de alto nivel que procesa archivos/páginas y usa un QRReader."""
-    def __init__(self, reader: QRReader):
+    def __init__(self, reader: QRReader, pdf_dpi: int = 200, workers: int = 1, min_paginas_paralelo: int = 8,
+                 dpi_grueso: int = 72, min_lado_qr: float = 0.3, cache: Optional[DecodeResultCache] = None,
+                 video_reader: Optional[QRReader] = None, video_muestras_por_segundo: float = 4,
+                 video_umbral_diferencia: float = 4.0, video_ancho_max: int = 960):
         self.reader = reader
+        # Videos (ver iter_video_payloads): como cada código aparece en muchos
+        # fotogramas, se puede usar un reader más barato que el de imágenes sueltas
+        self.video_reader = video_reader or reader
+        self.video_muestras_por_segundo = video_muestras_por_segundo
+        self.video_umbral_diferencia = video_umbral_diferencia
+        self.video_ancho_max = video_ancho_max
+        # Resultados ya decodificados de archivos idénticos (ver iter_payloads)
+        self.cache = cache
+        # Las páginas de PDF se leen de grueso a fino (ver decode_page):
+        # - dpi_grueso: pasada rápida en grises para localizar los QR
+        # - pdf_dpi: resolución de los recortes y de la página completa si hace falta
+        # - min_lado_qr: lado mínimo (pulgadas) de una región candidata
+        self.pdf_dpi = pdf_dpi
+        self.dpi_grueso = dpi_grueso
+        self.min_lado_qr = min_lado_qr
+        # PDFs con al menos `min_paginas_paralelo` páginas se reparten entre `workers` procesos
+        self.workers = workers
+        self.min_paginas_paralelo = min_paginas_paralelo
 
     def process_image(self, image_or_bytes) -> Any:
-        data = self.reader.decode(image_or_bytes)
+        return self.parse_data(self.reader.decode(image_or_bytes))
+
+    def process_image_multi(self, image_or_bytes) -> List[dict]:
+        """Como process_image pero con todos los QR de la imagen."""
+        payloads = []
+        for data in self.reader.decode_multi(image_or_bytes):
+            payload = self.parse_data(data)
+            if payload:
+                payloads.append(payload)
+        return payloads
+
+    def parse_data(self, data) -> Any:
+        """Convierte el contenido crudo de un QR en payload (dict) o None."""
         if not data:
             return None
         if isinstance(data, dict):
             return data  # por si en el futuro algún reader ya devuelve dict
+        # Formato compacto (Z1:<id>:<checksum>); las etiquetas JSON viejas siguen abajo
+        if es_compacto(data.strip()):
+            payload = decodificar_compacto(data)
+            if payload is None:
+                print(f"[process_image] Checksum inválido en QR compacto: {data}")
+            return payload
         try:
             return json.loads(data)
         except json.JSONDecodeError:
@@ -23,34 +73,283 @@ class QRService:
 
     def extract_payloads(self, archivo) -> List[dict]:
         """Extrae lista de payloads desde una imagen o PDF con QR"""
+        return list(self.iter_payloads(archivo))
 
+    def iter_payloads(self, archivo) -> Iterator[dict]:
+        """
+        Igual que extract_payloads pero va entregando los payloads a medida
+        que se decodifican. Los PDF no se cargan en memoria: se leen desde el
+        archivo temporal de la subida (o se copian por bloques a uno) y cada
+        página se libera antes de pasar a la siguiente.
+
+        Con caché, un archivo ya decodificado (mismo contenido, reader y
+        parámetros) devuelve sus payloads sin tocar fitz ni OpenCV.
+        """
+        if self.cache is None:
+            yield from self._iter_payloads(archivo)
+            return
+
+        clave = self.cache_key(archivo)
+        cacheados = self.cache.get(clave)
+        if cacheados is not None:
+            yield from cacheados
+            return
 
         payloads = []
+        for payload in self._iter_payloads(archivo):
+            payloads.append(payload)
+            yield payload
+        # Solo se guarda si el archivo se recorrió completo
+        self.cache.put(clave, payloads)
 
+    def cache_key(self, archivo) -> str:
+        tipo = "imagen" if isinstance(archivo, (bytes, bytearray)) else tipo_archivo(archivo.name)
+        if tipo == "video":
+            reader, params = type(self.video_reader), (
+                self.video_muestras_por_segundo, self.video_umbral_diferencia, self.video_ancho_max)
+        else:
+            reader, params = type(self.reader), (self.pdf_dpi, self.dpi_grueso, self.min_lado_qr)
+        return DecodeResultCache.huella(
+            archivo,
+            f"{reader.__module__}.{reader.__qualname__}",
+            tipo, *params,
+        )
+
+    def _iter_payloads(self, archivo) -> Iterator[dict]:
         if isinstance(archivo, (bytes, bytearray)):
             try:
                 img = Image.open(io.BytesIO(archivo)).convert("RGB")
-                payload = self.process_image(np.array(img, dtype=np.uint8))
-                if payload:
-                    payloads.append(payload)
+                yield from self.process_image_multi(np.array(img, dtype=np.uint8))
             except Exception as e:
                 print(f"[extract_payloads] No se pudo abrir imagen desde bytes: {e}")
-            return payloads
+            return
 
         # Caso: archivo Django UploadedFile o path
-        if archivo.name.endswith(".pdf"):
-            pdf = fitz.open(stream=archivo.read(), filetype="pdf")
-            for page in pdf:
-                pix = page.get_pixmap()
-                img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                payload = self.process_image(np.array(img, dtype=np.uint8))
-                if payload:
-                    payloads.append(payload)
+        tipo = tipo_archivo(archivo.name)
+        if tipo == "pdf":
+            with _archivo_en_disco(archivo, ".pdf") as ruta:
+                yield from self.iter_pdf_payloads(ruta)
+        elif tipo == "video":
+            with _archivo_en_disco(archivo, os.path.splitext(archivo.name)[1]) as ruta:
+                yield from self.iter_video_payloads(ruta)
         else:
             img = Image.open(archivo).convert("RGB")
-            payload = self.process_image(np.array(img, dtype=np.uint8))
+            yield from self.process_image_multi(np.array(img, dtype=np.uint8))
+
+    def extract_pdf_payloads(self, origen) -> List[dict]:
+        """Payloads de todas las páginas del PDF (ruta o bytes), en orden de página."""
+        return list(self.iter_pdf_payloads(origen))
+
+    def iter_pdf_payloads(self, origen) -> Iterator[dict]:
+        with _abrir_pdf(origen) as pdf:
+            n_paginas = pdf.page_count
+            if self.workers <= 1 or n_paginas < self.min_paginas_paralelo:
+                yield from self.iter_page_range(pdf, 0, n_paginas)
+                return
+
+        # Rangos contiguos de páginas (varios por proceso, para ir entregando
+        # resultados pronto); pool.map los devuelve en orden
+        workers = min(self.workers, n_paginas)
+        paso = -(-n_paginas // (workers * 4))
+        en_serie = copy.copy(self)
+        en_serie.workers = 1
+        en_serie.cache = None  # la caché (con su Lock) se queda en este proceso
+        rangos = [(inicio, min(inicio + paso, n_paginas)) for inicio in range(0, n_paginas, paso)]
+        hechos = 0
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                tareas = [(origen, inicio, fin, en_serie) for inicio, fin in rangos]
+                for payloads in pool.map(_extraer_rango, tareas):
+                    hechos += 1
+                    yield from payloads
+        except (BrokenProcessPool, OSError) as e:
+            print(f"[extract_payloads] Pool no disponible, procesando en serie: {e}")
+            # Se sigue desde el primer rango que no se llegó a entregar
+            inicio = rangos[hechos][0] if hechos < len(rangos) else n_paginas
+            with _abrir_pdf(origen) as pdf:
+                yield from self.iter_page_range(pdf, inicio, n_paginas)
+
+    def extract_page_range(self, pdf, inicio: int, fin: int) -> List[dict]:
+        return list(self.iter_page_range(pdf, inicio, fin))
+
+    def iter_page_range(self, pdf, inicio: int, fin: int) -> Iterator[dict]:
+        for i in range(inicio, fin):
+            page = pdf[i]
+            payloads = self.process_page(page)
+            del page  # libera la página (y sus pixmaps) antes de la siguiente
+            yield from payloads
+
+    def process_page(self, page) -> List[dict]:
+        # Una página del pedido trae varias etiquetas: se leen todas
+        payloads = []
+        for data in self.decode_page(page):
+            payload = self.parse_data(data)
             if payload:
                 payloads.append(payload)
-
         return payloads
 
+    def decode_page(self, page) -> List[str]:
+        """
+        Contenido crudo de los QR de una página, de grueso a fino:
+        1. Se rasteriza en grises a dpi_grueso y se localizan regiones candidatas.
+        2. Solo esas regiones se vuelven a rasterizar a pdf_dpi (clip de fitz)
+           y se decodifican por separado (con un reintento a 1.5x).
+        3. Si no hay candidatas o alguna no se pudo leer, se decodifica la
+           página completa a pdf_dpi y se añade lo que falte.
+        """
+        gris = self._render(page, self.dpi_grueso)
+        escala = 72 / self.dpi_grueso  # píxeles gruesos -> puntos PDF
+        regiones = localizar_regiones_qr(gris, min_lado=int(self.min_lado_qr * self.dpi_grueso))
+
+        datos = []
+        leidas = 0
+        for x, y, w, h in regiones:
+            margen = 0.3 * max(w, h)  # el bbox no incluye toda la zona de silencio del QR
+            clip = fitz.Rect(
+                (x - margen) * escala, (y - margen) * escala,
+                (x + w + margen) * escala, (y + h + margen) * escala,
+            ) & page.rect
+            # Si el recorte no se lee a pdf_dpi se reintenta una vez a 1.5x
+            for dpi in (self.pdf_dpi, self.pdf_dpi * 3 // 2):
+                encontrados = self.reader.decode_multi(self._render(page, dpi, clip))
+                if encontrados:
+                    break
+            leidas += bool(encontrados)
+            for data in encontrados:
+                if data not in datos:
+                    datos.append(data)
+
+        if not regiones or leidas < len(regiones):
+            for data in self.reader.decode_multi(self._render(page, self.pdf_dpi)):
+                if data not in datos:
+                    datos.append(data)
+        return datos
+
+    def iter_video_payloads(self, ruta) -> Iterator[dict]:
+        """
+        Payloads únicos de un video (MP4, MOV...) leído con OpenCV.
+        - Muestrea ~video_muestras_por_segundo fotogramas por segundo; los
+          intermedios solo se avanzan con grab(), sin convertirlos.
+        - Compara una miniatura en grises con el último fotograma decodificado
+          y salta los casi iguales; mientras la escena esté quieta el paso
+          entre muestras se va duplicando (hasta 4x).
+        - Cada fotograma se decodifica por regiones (ver decode_frame).
+        - Cada código se entrega una sola vez aunque aparezca en muchos fotogramas.
+        """
+        cap = cv2.VideoCapture(ruta)
+        if not cap.isOpened():
+            print(f"[iter_video_payloads] No se pudo abrir el video: {ruta}")
+            return
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS) or 30
+            paso_base = max(1, round(fps / self.video_muestras_por_segundo))
+            paso = paso_base
+            previa = None
+            vistos = set()
+
+            while True:
+                for _ in range(paso - 1):
+                    if not cap.grab():
+                        return
+                ok, frame = cap.read()
+                if not ok:
+                    return
+
+                gris = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                miniatura = cv2.resize(gris, (64, 36), interpolation=cv2.INTER_AREA)
+                if previa is not None and cv2.absdiff(miniatura, previa).mean() < self.video_umbral_diferencia:
+                    paso = min(paso * 2, paso_base * 4)
+                    continue
+                paso = paso_base
+                previa = miniatura
+
+                for data in self.decode_frame(gris):
+                    if data in vistos:
+                        continue
+                    vistos.add(data)
+                    payload = self.parse_data(data)
+                    if payload:
+                        yield payload
+        finally:
+            cap.release()
+
+    def decode_frame(self, gris) -> List[str]:
+        """
+        Un fotograma en grises: localiza los QR sobre una copia de 320 px de
+        ancho y decodifica cada recorte a resolución completa (un código por
+        recorte). Si no aparece ninguna región se decodifica el fotograma
+        entero, reducido a video_ancho_max.
+        """
+        escala = min(1.0, 320 / gris.shape[1])
+        chica = cv2.resize(gris, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA)
+        regiones = localizar_regiones_qr(chica, min_lado=15)
+
+        datos = []
+        for x, y, w, h in regiones:
+            margen = 0.3 * max(w, h)
+            x0, y0 = int(max(0, (x - margen) / escala)), int(max(0, (y - margen) / escala))
+            x1, y1 = int((x + w + margen) / escala), int((y + h + margen) / escala)
+            data = self.video_reader.decode(gris[y0:y1, x0:x1])
+            if data and data not in datos:
+                datos.append(data)
+        if regiones:
+            return datos
+
+        if gris.shape[1] > self.video_ancho_max:
+            factor = self.video_ancho_max / gris.shape[1]
+            gris = cv2.resize(gris, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+        return self.video_reader.decode_multi(gris)
+
+    @staticmethod
+    def _render(page, dpi, clip=None) -> np.ndarray:
+        pix = page.get_pixmap(dpi=dpi, clip=clip, colorspace=fitz.csGRAY)
+        gris = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)
+        gris = gris[:, :pix.width]
+        del pix  # el array ya tiene su propia copia de los píxeles
+        return gris
+
+
+def _extraer_rango(tarea) -> List[dict]:
+    # Se ejecuta en los procesos del pool: cada uno abre su propia copia del PDF
+    origen, inicio, fin, service = tarea
+    with _abrir_pdf(origen) as pdf:
+        return service.extract_page_range(pdf, inicio, fin)
+
+
+def _abrir_pdf(origen):
+    # Con una ruta, fitz lee las páginas del disco según se necesitan
+    if isinstance(origen, (bytes, bytearray)):
+        return fitz.open(stream=origen, filetype="pdf")
+    return fitz.open(origen)
+
+
+EXTENSIONES_VIDEO = (".mp4", ".mov", ".avi", ".mkv", ".webm", ".m4v")
+
+
+def tipo_archivo(nombre: str) -> str:
+    """'pdf', 'video' o 'imagen' según la extensión."""
+    nombre = (nombre or "").lower()
+    if nombre.endswith(".pdf"):
+        return "pdf"
+    if nombre.endswith(EXTENSIONES_VIDEO):
+        return "video"
+    return "imagen"
+
+
+@contextmanager
+def _archivo_en_disco(archivo, sufijo):
+    """Ruta en disco del archivo subido, copiándolo por bloques si hace falta."""
+    if hasattr(archivo, "temporary_file_path"):
+        # TemporaryUploadedFile: Django ya lo dejó en disco
+        yield archivo.temporary_file_path()
+        return
+
+    tmp = tempfile.NamedTemporaryFile(suffix=sufijo, delete=False)
+    try:
+        with tmp:
+            bloques = archivo.chunks() if hasattr(archivo, "chunks") else iter(lambda: archivo.read(1 << 20), b"")
+            for bloque in bloques:
+                tmp.write(bloque)
+        yield tmp.name
+    finally:
+        os.remove(tmp.name)
@@ -0,0 +1,65 @@
+from typing import List, NamedTuple
+
+from django.db import connections
+
+from app1.models import Zapato
+from .keyset import KeysetPaginator
+
+
+class PlanConsulta(NamedTuple):
+    nombre: str
+    plan: List[str]          # líneas del plan tal como las da el motor
+    tablas_escaneadas: List[str]  # tablas leídas completas, sin índice
+
+
+def consultas_criticas():
+    """
+    Las consultas calientes sobre Zapato, con la misma forma que usan las
+    vistas (los valores dan igual: el plan depende de la forma).
+    """
+    orden = ("modelo", "referencia", "id")
+    cursor = KeysetPaginator(Zapato.objects.all(), orden).despues_de(["Apache", "AP40RHA", 1], atras=False)
+    return [
+        ("carrito_get_or_create", Zapato.objects.filter(
+            referencia_normalizada="AP40RHA", modelo="Apache", talla="40", sexo="H", color="Rojo")),
+        ("carrito_borrar_referencia", Zapato.objects.filter(referencia_normalizada="AP40RHA")),
+        ("pedido_pendientes_referencia", Zapato.objects.filter(
+            referencia_normalizada="AP40RHA", estado="Pendientes").order_by("id")[:10]),
+        ("qr_resolver_referencias", Zapato.objects.filter(
+            referencia_normalizada__in=["AP40RHA", "BO38AMA"]).order_by("id")),
+        ("stock_por_referencia", Zapato.objects.filter(
+            referencia_normalizada="AP40RHA").order_by("modelo", "referencia", "id")[:51]),
+        ("stock_primera_pagina", Zapato.objects.order_by(*orden)[:51]),
+        ("stock_pagina_siguiente", Zapato.objects.filter(cursor).order_by(*orden)[:51]),
+        ("stock_por_modelo", Zapato.objects.filter(modelo="Apache").order_by(*orden)[:51]),
+        ("stock_por_estado", Zapato.objects.filter(estado__in=["Bodega"]).order_by(*orden)[:51]),
+        ("stock_filtro_completo", Zapato.objects.filter(
+            modelo="Apache", talla="40", color="Rojo", sexo__in=["H"], estado__in=["Bodega"]).order_by(*orden)[:51]),
+    ]
+
+
+def explicar(queryset, using="default") -> PlanConsulta:
+    """Plan de ejecución de un queryset (SQLite o MySQL) y qué tablas recorre enteras."""
+    conexion = connections[using]
+    sql, params = queryset.query.sql_with_params()
+    with conexion.cursor() as cursor:
+        if conexion.vendor == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            # (id, parent, notused, detail); "SCAN tabla" sin "USING ... INDEX" es un recorrido completo
+            plan = [fila[-1] for fila in cursor.fetchall()]
+            escaneadas = [linea.split()[1] for linea in plan
+                          if linea.startswith("SCAN ") and "INDEX" not in linea]
+        elif conexion.vendor == "mysql":
+            cursor.execute(f"EXPLAIN {sql}", params)
+            columnas = [c[0] for c in cursor.description]
+            filas = [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+            plan = [", ".join(f"{k}={v}" for k, v in fila.items()) for fila in filas]
+            escaneadas = [fila["table"] for fila in filas if fila.get("type") == "ALL"]
+        else:
+            raise NotImplementedError(f"Motor no soportado: {conexion.vendor}")
+    return PlanConsulta("", plan, escaneadas)
+
+
+def verificar_planes(using="default") -> List[PlanConsulta]:
+    """Explica todas las consultas críticas; las que tengan tablas_escaneadas fallan."""
+    return [explicar(qs, using)._replace(nombre=nombre) for nombre, qs in consultas_criticas()]
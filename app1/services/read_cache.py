@@ -0,0 +1,99 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.dispatch import Signal
+
+from app1.models import GeneracionCache
+
+# Se envía (sender=GeneracionCache) con `clave` (p.ej. "app1.zapato") y la
+# generación nueva (`valor`) cuando confirma la transacción que la subió
+generacion_incrementada = Signal()
+
+
+def nombre_modelo(modelo) -> str:
+    return modelo if isinstance(modelo, str) else modelo._meta.label_lower
+
+
+def incrementar(*modelos):
+    """
+    Invalida las lecturas cacheadas de esos modelos (o claves propias,
+    p.ej. "app1.zapato.referencias") subiendo su generación.
+    Se hace en la transacción de la escritura: hasta que esta confirma, el
+    resto de procesos siguen viendo (y cacheando) la generación anterior.
+    Al confirmar se envía `generacion_incrementada` con el valor nuevo.
+    """
+    nombres = [nombre_modelo(m) for m in modelos]
+    for nombre in nombres:
+        if GeneracionCache.objects.filter(modelo=nombre).update(valor=F('valor') + 1):
+            continue
+        try:
+            with transaction.atomic():
+                GeneracionCache.objects.create(modelo=nombre, valor=1)
+        except IntegrityError:
+            GeneracionCache.objects.filter(modelo=nombre).update(valor=F('valor') + 1)
+
+    valores = dict(GeneracionCache.objects.filter(modelo__in=nombres).values_list('modelo', 'valor'))
+    for nombre in nombres:
+        transaction.on_commit(
+            lambda nombre=nombre: generacion_incrementada.send(sender=GeneracionCache, clave=nombre, valor=valores[nombre])
+        )
+
+
+def generaciones(modelos: Iterable) -> Tuple[int, ...]:
+    """Generación actual de cada modelo, en una sola consulta."""
+    nombres = [nombre_modelo(m) for m in modelos]
+    valores = dict(GeneracionCache.objects.filter(modelo__in=nombres).values_list('modelo', 'valor'))
+    return tuple(valores.get(n, 0) for n in nombres)
+
+
+class ReadCache:
+    """
+    Caché en memoria (LRU) de lecturas derivadas de la base de datos:
+    facetas de Ver Stock, búsquedas y lista de clientes.
+
+    La clave incluye la generación de cada modelo del que depende el valor,
+    así que cualquier escritura (que llama a `incrementar`) hace que la
+    siguiente lectura se recalcule: no hay TTL ni datos viejos, y las
+    entradas de generaciones pasadas simplemente salen por LRU.
+    """
+    def __init__(self, max_entradas: int = 256, max_filas: int = 2000):
+        self.max_entradas = max_entradas
+        self.max_filas = max_filas
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave, modelos: Iterable, calcular: Callable, lista: bool = False):
+        """
+        Valor cacheado de `clave` para la generación actual de `modelos`,
+        o `calcular()` si no está. Con `lista=True` el valor se materializa
+        como lista y solo se guarda si tiene como mucho `max_filas` filas.
+        """
+        completa = (clave, generaciones(modelos))
+        valor = self._get(completa)
+        if valor is not None:
+            return valor
+
+        valor = calcular()
+        if lista:
+            valor = list(valor)
+            if len(valor) > self.max_filas:
+                return valor
+        self._put(completa, valor)
+        return valor
+
+    def _get(self, clave) -> Optional[object]:
+        with self._lock:
+            if clave not in self._entradas:
+                return None
+            self._entradas.move_to_end(clave)
+            return self._entradas[clave]
+
+    def _put(self, clave, valor):
+        with self._lock:
+            self._entradas[clave] = valor
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
@@ -0,0 +1,21 @@
+class ReferenciaBuilder:
+    """
+    Encapsula la regla actual de construcción de la clave:
+    {2 primeras del modelo}{talla}{inicial color}{sexo inicial}{letra}
+    y su forma normalizada (la que se indexa y se usa para buscar).
+    """
+    @staticmethod
+    def build(modelo: str, talla: str, color: str, sexo: str, letra: str) -> str:
+        modelo = (modelo or "").strip()
+        talla = str(talla or "").strip()
+        color = (color or "").strip()
+        sexo = (sexo or "").strip()
+        letra = (letra or "").strip().upper()
+
+        letra_sexo = sexo[:1].upper()
+        return f"{modelo[:2].upper()}{talla}{(color[:1] or '').upper()}{letra_sexo}{letra}"
+
+    @staticmethod
+    def normalizar(referencia) -> str:
+        """Sin espacios alrededor y en mayúsculas: así se guarda en Zapato.referencia_normalizada."""
+        return str(referencia or "").strip().upper()
@@ -0,0 +1,90 @@
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from app1.models import StockResumen, Zapato
+
+CAMPOS = Zapato.CAMPOS_STOCK
+
+
+def clave(zapato) -> tuple:
+    return tuple(getattr(zapato, campo) for campo in CAMPOS)
+
+
+def contar(filtros: dict) -> Optional[int]:
+    """
+    Cuántos zapatos cumplen `filtros` (lookups sobre los campos de stock,
+    p.ej. {"modelo": ..., "estado__in": [...]}) sumando StockResumen, sin
+    recorrer Zapato. None si algún filtro no es de un campo de stock.
+    """
+    if any(lookup.split("__")[0] not in CAMPOS for lookup in filtros):
+        return None
+    return StockResumen.objects.filter(**filtros).aggregate(total=Sum("cantidad"))["total"] or 0
+
+
+def ajustar(deltas: Dict[tuple, int]):
+    """
+    Suma cada delta a su fila de StockResumen (un UPDATE con F() por clave
+    distinta; si la fila no existe se crea). Las claves son tuplas en el
+    orden de Zapato.CAMPOS_STOCK.
+    """
+    for key, delta in deltas.items():
+        if not delta:
+            continue
+        filtro = dict(zip(CAMPOS, key))
+        if StockResumen.objects.filter(**filtro).update(cantidad=F('cantidad') + delta):
+            continue
+        try:
+            with transaction.atomic():
+                StockResumen.objects.create(cantidad=delta, **filtro)
+        except IntegrityError:
+            # Otra petición la creó entre el UPDATE y el INSERT
+            StockResumen.objects.filter(**filtro).update(cantidad=F('cantidad') + delta)
+
+
+def sumar_zapatos(zapatos: Iterable, signo: int = 1):
+    """Altas (signo=1) o bajas (signo=-1) de zapatos ya cargados o creados con bulk_create."""
+    ajustar(Counter({k: n * signo for k, n in Counter(map(clave, zapatos)).items()}))
+
+
+def mover_transicion(actualizados: Dict[str, List[int]], estado_nuevo: str):
+    """
+    Mueve el conteo de los zapatos que cambiaron de estado (ids agrupados
+    por estado de origen, como los da aplicar_transicion): una consulta
+    para leer el resto de la clave y un UPDATE por clave afectada.
+    """
+    origen_de = {zid: origen for origen, ids in actualizados.items() if origen != estado_nuevo for zid in ids}
+    if not origen_de:
+        return
+    deltas = Counter()
+    filas = Zapato.objects.filter(id__in=list(origen_de)).values_list('id', 'modelo', 'talla', 'color', 'sexo')
+    for zid, *resto in filas:
+        deltas[(*resto, origen_de[zid])] -= 1
+        deltas[(*resto, estado_nuevo)] += 1
+    ajustar(deltas)
+
+
+def reconstruir() -> int:
+    """
+    Recalcula StockResumen desde Zapato. Devuelve cuántas claves tenían un
+    conteo distinto al real (0 = el resumen incremental estaba al día).
+    """
+    with transaction.atomic():
+        reales = {
+            tuple(g[c] for c in CAMPOS): g['n']
+            for g in Zapato.objects.values(*CAMPOS).annotate(n=Count('id')).order_by()
+        }
+        actuales = {
+            tuple(f[c] for c in CAMPOS): f['cantidad']
+            for f in StockResumen.objects.filter(cantidad__gt=0).values(*CAMPOS, 'cantidad')
+        }
+        diferencias = sum(1 for k in reales.keys() | actuales.keys() if reales.get(k, 0) != actuales.get(k, 0))
+
+        StockResumen.objects.all().delete()
+        StockResumen.objects.bulk_create(
+            [StockResumen(cantidad=n, **dict(zip(CAMPOS, k))) for k, n in reales.items()],
+            batch_size=500,
+        )
+    return diferencias
@@ -0,0 +1,145 @@
+import threading
+from bisect import bisect_left, insort
+from typing import Callable, Iterable, List, Optional
+
+from django.db import transaction
+
+from app1.models import Cliente, GeneracionCache, Zapato
+from .read_cache import generacion_incrementada, generaciones, incrementar, nombre_modelo
+from .referencia import ReferenciaBuilder
+
+# Generación propia del índice de referencias: solo sube cuando aparece o
+# desaparece una referencia, no con cada escritura de Zapato (cambios de estado)
+CLAVE_REFERENCIAS = "app1.zapato.referencias"
+
+
+class PrefixIndex:
+    """
+    Índice en memoria (lista ordenada + bisect) para autocompletar por prefijo.
+
+    - Las escrituras de este proceso lo actualizan de forma incremental al
+      confirmar la transacción (`agregar`, `quitar`, `invalidar`).
+    - Para ver las de otros procesos se apoya en una generación de
+      services.read_cache (`clave`): cada confirmación propia la avanza en
+      uno; si la de la base de datos no cuadra con la esperada, alguien más
+      escribió y el índice se reconstruye entero en la siguiente búsqueda.
+    """
+    def __init__(self, clave: str, cargar: Callable[[], Iterable[str]], normalizar: Callable[[str], str] = str.casefold):
+        self.clave = clave
+        self.cargar = cargar
+        self.normalizar = normalizar
+        self._claves: List[str] = []
+        self._valores = {}             # clave normalizada -> valor a mostrar
+        self._generacion: Optional[int] = None
+        self._lock = threading.Lock()
+        generacion_incrementada.connect(self._al_incrementar, sender=GeneracionCache, weak=False)
+
+    def buscar(self, prefijo: str, limite: int = 10) -> List[str]:
+        prefijo = self.normalizar(prefijo or "")
+        if not prefijo:
+            return []
+        generacion = generaciones([self.clave])[0]
+        with self._lock:
+            if self._generacion != generacion:
+                self._reconstruir(generacion)
+            resultados = []
+            for clave in self._claves[bisect_left(self._claves, prefijo):]:
+                if not clave.startswith(prefijo) or len(resultados) >= limite:
+                    break
+                resultados.append(self._valores[clave])
+            return resultados
+
+    def agregar(self, valores: Iterable[str]):
+        valores = list(valores)
+        transaction.on_commit(lambda: self._aplicar(valores, []))
+
+    def quitar(self, valores: Iterable[str]):
+        valores = list(valores)
+        transaction.on_commit(lambda: self._aplicar([], valores))
+
+    def invalidar(self):
+        """Para cambios que no se pueden aplicar por partes (renombres, borrados en cascada)."""
+        transaction.on_commit(self._marcar_sucio)
+
+    # --- Internos ---
+    def _reconstruir(self, generacion):
+        self._valores = {self.normalizar(v): v for v in self.cargar() if v}
+        self._claves = sorted(self._valores)
+        self._generacion = generacion
+
+    def _aplicar(self, nuevos, quitados):
+        with self._lock:
+            if self._generacion is None:
+                return  # aún no se ha construido: se cargará completo al buscar
+            for valor in filter(None, nuevos):
+                clave = self.normalizar(valor)
+                if clave not in self._valores:
+                    insort(self._claves, clave)
+                self._valores[clave] = valor
+            for valor in quitados:
+                clave = self.normalizar(valor)
+                if self._valores.pop(clave, None) is not None:
+                    del self._claves[bisect_left(self._claves, clave)]
+
+    def _marcar_sucio(self):
+        with self._lock:
+            self._generacion = None
+
+    def _al_incrementar(self, sender, clave, valor, **kwargs):
+        if clave != self.clave:
+            return
+        with self._lock:
+            if self._generacion is not None:
+                # Si no es la siguiente, hubo escrituras de otro proceso por medio
+                self._generacion = valor if valor == self._generacion + 1 else None
+
+
+_indices = {}
+_indices_lock = threading.Lock()
+
+
+def _indice(nombre, fabrica) -> PrefixIndex:
+    with _indices_lock:
+        if nombre not in _indices:
+            _indices[nombre] = fabrica()
+        return _indices[nombre]
+
+
+def indice_clientes() -> PrefixIndex:
+    return _indice("clientes", lambda: PrefixIndex(
+        nombre_modelo(Cliente), lambda: Cliente.objects.values_list("nombre", flat=True).iterator(chunk_size=2000)))
+
+
+def indice_referencias() -> PrefixIndex:
+    return _indice("referencias", lambda: PrefixIndex(
+        CLAVE_REFERENCIAS,
+        lambda: Zapato.objects.values_list("referencia_normalizada", flat=True).distinct().iterator(chunk_size=2000),
+        normalizar=ReferenciaBuilder.normalizar,
+    ))
+
+
+# --- Cambios en el conjunto de referencias ---
+# Se llaman dentro de la transacción de la escritura, después de ella.
+def referencias_agregadas(referencias: Iterable[str], nuevos_ids: Iterable[int] = ()):
+    """Tras crear zapatos: añade las referencias que no tenía ningún otro zapato."""
+    referencias = set(referencias)
+    ya_estaban = set(Zapato.objects.filter(referencia_normalizada__in=referencias)
+                     .exclude(pk__in=list(nuevos_ids)).values_list("referencia_normalizada", flat=True))
+    if referencias - ya_estaban:
+        indice_referencias().agregar(referencias - ya_estaban)
+        incrementar(CLAVE_REFERENCIAS)
+
+
+def referencias_quitadas(referencias: Iterable[str]):
+    """Tras borrar zapatos: quita las referencias que ya no tiene ningún zapato."""
+    referencias = set(referencias)
+    quedan = set(Zapato.objects.filter(referencia_normalizada__in=referencias)
+                 .values_list("referencia_normalizada", flat=True))
+    if referencias - quedan:
+        indice_referencias().quitar(referencias - quedan)
+        incrementar(CLAVE_REFERENCIAS)
+
+
+def referencia_renombrada():
+    indice_referencias().invalidar()
+    incrementar(CLAVE_REFERENCIAS)
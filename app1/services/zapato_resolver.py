@@ -0,0 +1,118 @@
+from itertools import islice
+from typing import Dict, Iterable, List, NamedTuple
+
+from django.db import transaction
+
+from app1.models import Zapato
+from .estado_service import aplicar_transicion
+from .referencia import ReferenciaBuilder
+from .eventos_service import ORIGEN_QR, registrar_transicion
+
+
+class Resolucion(NamedTuple):
+    zapatos: List[Zapato]      # en el orden en que se leyeron, sin repetidos
+    faltantes: List[dict]      # payloads que no corresponden a ningún zapato
+    leidos: int = 0            # payloads recibidos
+
+
+class ResultadoLote(NamedTuple):
+    actualizados: List[int]              # ids que quedaron en el estado nuevo
+    faltantes: List[int]                 # ids que ya no existen en la base de datos
+    rechazados: Dict[str, List[int]]     # estado actual -> ids que no pueden pasar al nuevo
+    invalidos: List[str]                 # valores que no son un id válido
+
+
+def _como_id(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def resolver_payloads(payloads: Iterable[dict]) -> Resolucion:
+    """
+    Traduce los payloads leídos de los QR a zapatos con un número fijo de
+    consultas: una para todos los ids (in_bulk ya parte la lista si el motor
+    limita los parámetros) y otra para todas las referencias, por el índice
+    de referencia_normalizada.
+    Los payloads con id mandan; la referencia solo se usa si no traen id y,
+    como antes, gana el zapato más antiguo con esa referencia.
+    """
+    payloads = [p for p in payloads if isinstance(p, dict)]
+    ids = {_como_id(p.get("id")) for p in payloads if p.get("id")} - {None}
+    referencias = {ReferenciaBuilder.normalizar(p["referencia"]) for p in payloads if not p.get("id") and p.get("referencia")}
+
+    por_id = Zapato.objects.in_bulk(ids) if ids else {}
+    por_referencia = {}
+    if referencias:
+        candidatos = Zapato.objects.filter(referencia_normalizada__in=referencias).order_by("id")
+        for z in candidatos:
+            por_referencia.setdefault(z.referencia_normalizada, z)
+
+    zapatos, vistos, faltantes = [], set(), []
+    for p in payloads:
+        if p.get("id"):
+            z = por_id.get(_como_id(p.get("id")))
+        elif p.get("referencia"):
+            z = por_referencia.get(ReferenciaBuilder.normalizar(p["referencia"]))
+        else:
+            z = None
+
+        if z is None:
+            faltantes.append(p)
+        elif z.id not in vistos:
+            vistos.add(z.id)
+            zapatos.append(z)
+    return Resolucion(zapatos, faltantes, len(payloads))
+
+
+def resolver_por_lotes(payloads: Iterable[dict], tamano: int = 500) -> Resolucion:
+    """
+    Como resolver_payloads, pero consume `payloads` (p.ej. el iterador de
+    QRService.iter_payloads) por lotes de `tamano`: no se guardan todos los
+    payloads a la vez y las consultas salen por lote.
+    """
+    iterador = iter(payloads)
+    zapatos, vistos, faltantes, leidos = [], set(), [], 0
+    while True:
+        lote = list(islice(iterador, tamano))
+        if not lote:
+            break
+        parcial = resolver_payloads(lote)
+        leidos += parcial.leidos
+        faltantes.extend(parcial.faltantes)
+        for z in parcial.zapatos:
+            if z.id not in vistos:
+                vistos.add(z.id)
+                zapatos.append(z)
+    return Resolucion(zapatos, faltantes, leidos)
+
+
+def actualizar_estado_lote(zapato_ids: Iterable, estado_nuevo: str, usuario=None) -> ResultadoLote:
+    """
+    Aplica `estado_nuevo` a los zapatos con aplicar_transicion (un UPDATE
+    por estado de origen permitido, todo en una transacción). Devuelve qué
+    ids se actualizaron, cuáles no existen, cuáles no pueden pasar a ese
+    estado y qué valores se descartaron por no ser ids. Los cambios quedan
+    en ZapatoEvento dentro de la misma transacción.
+    """
+    ids, invalidos = [], []
+    for valor in zapato_ids:
+        zid = _como_id(valor)
+        if zid is None:
+            invalidos.append(str(valor))
+        else:
+            ids.append(zid)
+    ids = list(dict.fromkeys(ids))
+
+    with transaction.atomic():
+        resultado = aplicar_transicion(Zapato.objects.filter(id__in=ids), estado_nuevo)
+        registrar_transicion(resultado, estado_nuevo, usuario, ORIGEN_QR)
+    en_estado = set(resultado.ids_actualizados) | set(resultado.sin_cambio)
+    existentes = en_estado | set(resultado.ids_rechazados)
+    return ResultadoLote(
+        actualizados=[zid for zid in ids if zid in en_estado],
+        faltantes=[zid for zid in ids if zid not in existentes],
+        rechazados=resultado.rechazados,
+        invalidos=invalidos,
+    )
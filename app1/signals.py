@@ -0,0 +1,110 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Cliente, Pedido, Zapato
+from .services import borrado_service, stock_service
+from .services.estado_service import transicion_aplicada
+from .services.read_cache import incrementar
+from .services.typeahead import (
+    indice_clientes, referencia_renombrada, referencias_agregadas, referencias_quitadas,
+)
+
+
+@receiver(post_save, sender=Zapato)
+def actualizar_stock_al_guardar(sender, instance, created, raw=False, **kwargs):
+    """Altas y cambios fila a fila (save/create/get_or_create)."""
+    if raw:
+        return  # loaddata
+    nueva = stock_service.clave(instance)
+    anterior = None if created else getattr(instance, '_clave_stock_db', None)
+    if anterior == nueva:
+        return
+    deltas = {nueva: 1}
+    if anterior is not None:
+        deltas[anterior] = -1
+    stock_service.ajustar(deltas)
+    instance._clave_stock_db = nueva
+
+
+@receiver(post_delete, sender=Zapato)
+def actualizar_stock_al_borrar(sender, instance, **kwargs):
+    """
+    Cualquier borrado: delete(), en cascada (Pedido, Cliente), admin. Dentro
+    de borrado_en_bloque() solo se anota y el bloque ajusta todo al final.
+    """
+    anterior = getattr(instance, '_clave_stock_db', None) or stock_service.clave(instance)
+    bloque = borrado_service.actual()
+    if bloque is not None:
+        bloque.stock[anterior] += 1
+    else:
+        stock_service.ajustar({anterior: -1})
+
+
+@receiver(transicion_aplicada, sender=Zapato)
+def actualizar_stock_en_transicion(sender, actualizados, estado_nuevo, **kwargs):
+    stock_service.mover_transicion(actualizados, estado_nuevo)
+
+
+# --- Índices de autocompletado (services.typeahead) ---
+# Van antes que las generaciones: al confirmar, el índice aplica el cambio
+# y luego recibe la generación nueva que le corresponde.
+@receiver(post_save, sender=Cliente)
+def autocompletar_cliente_guardado(sender, instance, created, **kwargs):
+    if created:
+        indice_clientes().agregar([instance.nombre])
+    else:
+        indice_clientes().invalidar()  # pudo cambiar el nombre
+
+
+@receiver(post_delete, sender=Cliente)
+def autocompletar_cliente_borrado(sender, instance, **kwargs):
+    indice_clientes().quitar([instance.nombre])
+
+
+# Las referencias tienen su propia generación: los cambios de estado no la tocan
+@receiver(post_save, sender=Zapato)
+def autocompletar_zapato_guardado(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        referencias_agregadas([instance.referencia_normalizada], [instance.pk])
+    elif getattr(instance, '_referencia_db', None) != instance.referencia_normalizada:
+        referencia_renombrada()
+    instance._referencia_db = instance.referencia_normalizada
+
+
+@receiver(post_delete, sender=Zapato)
+def autocompletar_zapato_borrado(sender, instance, **kwargs):
+    # También en cascada (Pedido, Cliente): Django avisa después de borrar.
+    # Dentro de borrado_en_bloque() se revisan todas juntas al final
+    bloque = borrado_service.actual()
+    if bloque is not None:
+        bloque.referencias.add(instance.referencia_normalizada)
+    else:
+        referencias_quitadas([instance.referencia_normalizada])
+
+
+# --- Generaciones de la caché de lecturas (services.read_cache) ---
+@receiver(post_save, sender=Zapato)
+@receiver(post_delete, sender=Zapato)
+@receiver(transicion_aplicada, sender=Zapato)
+def invalidar_lecturas_zapato(sender, **kwargs):
+    # Cualquier escritura, también borrados en cascada y desde el admin;
+    # dentro de borrado_en_bloque() sube una sola vez, al final
+    bloque = borrado_service.actual()
+    if bloque is not None:
+        bloque.lecturas = True
+    else:
+        incrementar(Zapato)
+
+
+@receiver(post_save, sender=Cliente)
+def invalidar_lecturas_cliente(sender, **kwargs):
+    incrementar(Cliente)
+
+
+@receiver(post_delete, sender=Cliente)
+@receiver(post_delete, sender=Pedido)
+def invalidar_lecturas_borrado(sender, **kwargs):
+    # Sus zapatos en cascada ya avisan con su propio post_delete
+    incrementar(sender)
@@ -0,0 +1,26 @@
+// Autocompletado: llena el <datalist> de un input con las sugerencias del
+// endpoint de su atributo data-typeahead a medida que se escribe.
+document.querySelectorAll('input[data-typeahead]').forEach(function (input) {
+    var lista = document.getElementById(input.getAttribute('list'));
+    var espera = null;
+    var ultima = null;
+
+    input.addEventListener('input', function () {
+        clearTimeout(espera);
+        espera = setTimeout(function () {
+            var q = input.value.trim();
+            if (!q || q === ultima) { return; }
+            ultima = q;
+            fetch(input.dataset.typeahead + '?q=' + encodeURIComponent(q), {credentials: 'same-origin'})
+                .then(function (r) { return r.ok ? r.json() : {resultados: []}; })
+                .then(function (data) {
+                    if (q !== ultima) { return; }  // llegó tarde: ya se escribió otra cosa
+                    lista.replaceChildren.apply(lista, data.resultados.map(function (valor) {
+                        var opcion = document.createElement('option');
+                        opcion.value = valor;
+                        return opcion;
+                    }));
+                });
+        }, 150);
+    });
+});
@@ -1,3 +1,764 @@
-from django.test import TestCase
+import io
+import json
+import os
+import pickle
+import shutil
+import tracemalloc
+import tempfile
+from contextlib import redirect_stdout
+from unittest import mock
 
-# Create your tests here.
+import cv2
+import fitz
+import numpy as np
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Cliente, Empleado, GeneracionCache, Pedido, StockResumen, Zapato, ZapatoEvento
+from .services import stock_service
+from .services.borrado_service import borrado_en_bloque
+from .services.busqueda import buscar
+from .services.cascade_qr_reader import CascadeQRReader
+from .services.estado_service import aplicar_transicion
+from .services.opencv_qr_reader import OpenCVQRReader
+from .services.qr_benchmark import MuestraQR, medir_reader, readers_registrados
+from .services.decode_cache import DecodeResultCache
+from .services.qr_cache import QRCache
+from .services.qr_generator import QRBatchGenerator, codificar_texto, matriz_qr
+from .services.qr_payload import codificar_compacto, decodificar_compacto
+from .services.qr_pdf import dibujar_qr_vectorial
+from .services.qr_reader import QRReader
+from .services.qr_regions import localizar_regiones_qr
+from .services.qr_service import QRService
+from .services.query_plan import verificar_planes
+from .services.read_cache import ReadCache, generaciones
+from .services.typeahead import CLAVE_REFERENCIAS, indice_clientes, indice_referencias
+from .services.zapato_resolver import resolver_payloads
+
+
+class QRCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+
+    def test_sobrescribir_no_cuenta_dos_veces(self):
+        cache = QRCache(self.directorio, max_bytes_disco=1000)
+        cache.evict()  # mide el disco (vacío)
+        for _ in range(5):
+            cache.put("k", b"x" * 300)
+        self.assertEqual(cache._bytes_disco, 300)
+        self.assertEqual(cache.evict(), 0)
+
+
+class QRBatchGeneratorTests(SimpleTestCase):
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        self.zapatos = [Zapato(id=i) for i in (7, 3, 11, 3, 5)]
+
+    def generar(self):
+        generador = QRBatchGenerator(workers=2, min_paralelo=1, cache=QRCache(self.directorio), formato="compact")
+        return generador.generate(self.zapatos)
+
+    def leidos(self, rutas):
+        lector = OpenCVQRReader()
+        leidos = []
+        for ruta in rutas:
+            with open(ruta, "rb") as f:
+                leidos.append(lector.decode(f.read()))
+        return leidos
+
+    def test_en_el_orden_de_entrada(self):
+        esperados = [codificar_compacto(z.id) for z in self.zapatos]
+        self.assertEqual(self.leidos(self.generar()), esperados)
+
+    def test_en_serie_si_el_pool_no_arranca(self):
+        with mock.patch("app1.services.qr_generator.ProcessPoolExecutor", side_effect=OSError("sin fork")):
+            rutas = self.generar()
+        self.assertEqual(self.leidos(rutas), [codificar_compacto(z.id) for z in self.zapatos])
+
+
+def crear_zapato(**campos):
+    datos = dict(referencia="AP40RHA", modelo="Apache", talla="40", sexo="H", color="Rojo", requerimientos="")
+    datos.update(campos)
+    return Zapato.objects.create(**datos)
+
+
+class QRPayloadTests(TestCase):
+    def setUp(self):
+        self.service = QRService(OpenCVQRReader())
+
+    def parse(self, texto):
+        with redirect_stdout(io.StringIO()) as salida:
+            return self.service.parse_data(texto), salida.getvalue()
+
+    def test_compacto_ida_y_vuelta(self):
+        texto = codificar_compacto(123456)
+        self.assertRegex(texto, r"^Z1:123456:[0-9A-Z]{4}$")
+        self.assertEqual(decodificar_compacto(texto), {"id": 123456, "formato": "Z1"})
+        self.assertEqual(self.parse(f" {texto}\n")[0], {"id": 123456, "formato": "Z1"})
+
+    def test_checksum_invalido(self):
+        texto = codificar_compacto(42)
+        malo = texto[:-1] + ("A" if texto[-1] != "A" else "B")
+        payload, salida = self.parse(malo)
+        self.assertIsNone(payload)
+        self.assertIn("Checksum inválido", salida)
+        # Otro id con el checksum del 42 tampoco vale
+        self.assertIsNone(decodificar_compacto(texto.replace(":42:", ":43:")))
+
+    def test_prefijo_desconocido(self):
+        checksum = codificar_compacto(42).rsplit(":", 1)[1]
+        self.assertIsNone(self.parse(f"Z2:42:{checksum}")[0])  # versión futura: se descarta
+        self.assertEqual(self.parse(f"X1:42:{checksum}")[0], {"raw_data": f"X1:42:{checksum}"})
+
+    def test_resolver_con_formatos_nuevo_y_viejo(self):
+        compacto, viejo, por_referencia = crear_zapato(), crear_zapato(), crear_zapato(referencia="BO38AMM")
+        leidos = [
+            self.parse(codificar_compacto(compacto.id))[0],
+            self.parse(json.dumps({"id": viejo.id, "referencia": viejo.referencia, "modelo": "Apache"}))[0],
+            self.parse(json.dumps({"referencia": " bo38amm "}))[0],
+            self.parse("X1:42:ABCD")[0],
+            self.parse(codificar_compacto(999999))[0],
+        ]
+        resolucion = resolver_payloads(leidos)
+        self.assertEqual(resolucion.zapatos, [compacto, viejo, por_referencia])
+        self.assertEqual(resolucion.faltantes, [{"raw_data": "X1:42:ABCD"}, {"id": 999999, "formato": "Z1"}])
+
+
+def imagen_qrs(*ids, separacion=20) -> np.ndarray:
+    """Imagen en grises con un QR compacto por id, uno al lado del otro."""
+    qrs = [np.array(codificar_texto(codificar_compacto(i)).get_image().convert("L"), dtype=np.uint8) for i in ids]
+    alto = max(qr.shape[0] for qr in qrs)
+    return np.hstack([np.pad(qr, ((0, alto - qr.shape[0]), (0, separacion)), constant_values=255) for qr in qrs])
+
+
+class DecodeMultiTests(SimpleTestCase):
+    def test_todos_los_qr_de_la_imagen(self):
+        imagen = imagen_qrs(1, 22, 333)
+        self.assertCountEqual(OpenCVQRReader().decode_multi(imagen), [codificar_compacto(i) for i in (1, 22, 333)])
+        payloads = QRService(OpenCVQRReader()).process_image_multi(imagen)
+        self.assertCountEqual([p["id"] for p in payloads], [1, 22, 333])
+
+    def test_un_solo_qr_y_ninguno(self):
+        lector = OpenCVQRReader()
+        self.assertEqual(lector.decode_multi(imagen_qrs(5)), [codificar_compacto(5)])
+        self.assertEqual(lector.decode_multi(np.full((200, 200), 255, dtype=np.uint8)), [])
+
+    def test_readers_sin_decode_multi(self):
+        class SoloDecode(QRReader):
+            def decode(self, image_or_bytes):
+                return OpenCVQRReader().decode(image_or_bytes)
+
+        self.assertEqual(SoloDecode().decode_multi(imagen_qrs(5)), [codificar_compacto(5)])
+        self.assertEqual(SoloDecode().decode_multi(np.full((200, 200), 255, dtype=np.uint8)), [])
+
+
+def pdf_qrs(paginas, lado=100) -> bytes:
+    """PDF con una página por lista de ids y un QR compacto vectorial por id."""
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    for ids in paginas:
+        for n, zapato_id in enumerate(ids):
+            dibujar_qr_vectorial(c, matriz_qr(codificar_compacto(zapato_id)), 50 + n * (lado + 40), 600, lado)
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+class DecodeResultCacheTests(SimpleTestCase):
+    def test_caducan_por_ttl(self):
+        cache = DecodeResultCache(ttl=60)
+        with mock.patch("app1.services.decode_cache.time.monotonic", return_value=1000):
+            cache.put("a", [{"id": 1}])
+        with mock.patch("app1.services.decode_cache.time.monotonic", return_value=1059):
+            self.assertEqual(cache.get("a"), [{"id": 1}])
+        with mock.patch("app1.services.decode_cache.time.monotonic", return_value=1061):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache._total_payloads, 0)
+
+    def test_desaloja_los_menos_usados(self):
+        cache = DecodeResultCache(max_entradas=2, max_payloads=5)
+        cache.put("a", [{"id": 1}])
+        cache.put("b", [{"id": 2}])
+        cache.get("a")
+        cache.put("c", [{"id": 3}])  # sobran entradas: sale "b"
+        self.assertIsNone(cache.get("b"))
+        cache.put("d", [{"id": i} for i in range(4)])  # sobran payloads: sale "a"
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("c"), [{"id": 3}])
+        cache.put("e", [{"id": i} for i in range(6)])  # no cabe ni sola: no se guarda
+        self.assertIsNone(cache.get("e"))
+        self.assertEqual(cache._total_payloads, 5)
+
+    def test_clave_por_contenido_reader_y_parametros(self):
+        service = QRService(OpenCVQRReader())
+        archivo = SimpleUploadedFile("pedido.pdf", b"%PDF-1.4 contenido")
+        clave = service.cache_key(archivo)
+        self.assertEqual(archivo.read(), b"%PDF-1.4 contenido")  # se rebobina tras el hash
+        self.assertEqual(service.cache_key(SimpleUploadedFile("otro.pdf", b"%PDF-1.4 contenido")), clave)
+        self.assertNotEqual(service.cache_key(SimpleUploadedFile("pedido.pdf", b"%PDF-1.4 otro")), clave)
+        self.assertNotEqual(QRService(OpenCVQRReader(), pdf_dpi=300).cache_key(archivo), clave)
+        self.assertNotEqual(QRService(CascadeQRReader()).cache_key(archivo), clave)
+
+
+class PDFParaleloTests(SimpleTestCase):
+    def setUp(self):
+        self.pdf = pdf_qrs([[i, 100 + i] for i in range(1, 7)])
+        self.esperados = [{i, 100 + i} for i in range(1, 7)]
+
+    def leer(self, **opciones):
+        service = QRService(OpenCVQRReader(), workers=2, min_paginas_paralelo=2, **opciones)
+        ids = [p["id"] for p in service.iter_pdf_payloads(self.pdf)]
+        # Orden de página; dentro de la página el del detector
+        return [set(ids[i:i + 2]) for i in range(0, len(ids), 2)]
+
+    def test_en_orden_de_pagina(self):
+        self.assertEqual(self.leer(), self.esperados)
+
+    def test_con_cache_de_lecturas(self):
+        service = QRService(OpenCVQRReader(), workers=2, min_paginas_paralelo=2, cache=DecodeResultCache())
+        primera = list(service.iter_payloads(SimpleUploadedFile("pedido.pdf", self.pdf)))
+        ids = [p["id"] for p in primera]
+        self.assertEqual([set(ids[i:i + 2]) for i in range(0, len(ids), 2)], self.esperados)
+        with mock.patch("app1.services.qr_service.ProcessPoolExecutor") as pool:
+            segunda = list(service.iter_payloads(SimpleUploadedFile("pedido.pdf", self.pdf)))
+        pool.assert_not_called()  # mismo archivo: sale de la caché
+        self.assertEqual(segunda, primera)
+
+    def test_en_serie_si_el_pool_no_arranca(self):
+        with mock.patch("app1.services.qr_service.ProcessPoolExecutor", side_effect=OSError("sin fork")), \
+                redirect_stdout(io.StringIO()):
+            self.assertEqual(self.leer(), self.esperados)
+
+
+class PDFEnSerieTests(SimpleTestCase):
+    def abiertos(self, consumir):
+        documentos = []
+
+        def abrir(origen):
+            documentos.append(fitz.open(stream=origen, filetype="pdf"))
+            return documentos[-1]
+
+        with mock.patch("app1.services.qr_service._abrir_pdf", side_effect=abrir):
+            consumir(QRService(OpenCVQRReader()).iter_pdf_payloads(pdf_qrs([[1], [2], [3]])))
+        return documentos
+
+    def test_cierra_el_documento(self):
+        documentos = self.abiertos(list)
+        self.assertEqual(len(documentos), 1)
+        self.assertTrue(documentos[0].is_closed)
+
+    def test_cierra_el_documento_a_medio_leer(self):
+        def primero(payloads):
+            next(payloads)
+            payloads.close()
+
+        self.assertTrue(self.abiertos(primero)[0].is_closed)
+
+
+class PaginaGruesoAFinoTests(SimpleTestCase):
+    def setUp(self):
+        documento = fitz.open(stream=pdf_qrs([[1, 2, 3]], lado=80), filetype="pdf")
+        self.addCleanup(documento.close)
+        self.pagina = documento[0]
+        self.service = QRService(OpenCVQRReader())
+
+    def decode_page(self):
+        with mock.patch.object(QRService, "_render", wraps=QRService._render) as render:
+            datos = self.service.decode_page(self.pagina)
+        return datos, [(llamada.args[1], len(llamada.args) > 2) for llamada in render.call_args_list]
+
+    def test_regiones_en_la_pasada_gruesa(self):
+        gris = QRService._render(self.pagina, self.service.dpi_grueso)
+        self.assertEqual(len(localizar_regiones_qr(gris, min_lado=int(self.service.min_lado_qr * self.service.dpi_grueso))), 3)
+
+    def test_solo_se_rasterizan_los_recortes(self):
+        datos, renders = self.decode_page()
+        self.assertCountEqual(datos, [codificar_compacto(i) for i in (1, 2, 3)])
+        # Una pasada gruesa de la página y un recorte por QR a pdf_dpi
+        self.assertEqual(renders, [(72, False)] + [(200, True)] * 3)
+
+    def test_pagina_completa_sin_regiones(self):
+        with mock.patch("app1.services.qr_service.localizar_regiones_qr", return_value=[]):
+            datos, renders = self.decode_page()
+        self.assertCountEqual(datos, [codificar_compacto(i) for i in (1, 2, 3)])
+        self.assertEqual(renders, [(72, False), (200, False)])
+
+
+class CascadeQRReaderTests(SimpleTestCase):
+    def test_pasa_a_la_siguiente_etapa(self):
+        # Módulos de ~1.5 px: la pasada en grises no lo lee, el reescalado sí
+        imagen = cv2.resize(imagen_qrs(77), None, fx=0.15, fy=0.15, interpolation=cv2.INTER_AREA)
+        reader = CascadeQRReader()
+        self.assertEqual(reader._gris(imagen), [])
+
+        self.assertEqual(reader.decode_multi(imagen), [codificar_compacto(77)])
+        self.assertEqual(reader.estadisticas(), {"escalado": 1})
+
+    def test_estadisticas_y_log(self):
+        reader = CascadeQRReader(log_cada=3)
+        blanca = np.full((120, 120), 255, dtype=np.uint8)
+        with redirect_stdout(io.StringIO()) as salida:
+            self.assertEqual(reader.decode(imagen_qrs(5)), codificar_compacto(5))
+            self.assertIsNone(reader.decode(blanca))
+            self.assertEqual(salida.getvalue(), "")
+            reader.decode(imagen_qrs(6))
+        self.assertEqual(reader.estadisticas(), {"gris": 2, "fallo": 1})
+        self.assertIn("etapas tras 3 imágenes", salida.getvalue())
+
+        copia = pickle.loads(pickle.dumps(reader))  # como la recibe el pool de procesos
+        self.assertEqual((copia.log_cada, copia.estadisticas()), (3, {}))
+        self.assertEqual(copia.decode(imagen_qrs(5)), codificar_compacto(5))
+
+
+class BenchmarkQRTests(SimpleTestCase):
+    def test_comando_con_un_reader(self):
+        salida = tempfile.NamedTemporaryFile(suffix=".json", delete=False)
+        salida.close()
+        self.addCleanup(os.remove, salida.name)
+        call_command("benchmark_qr", zapatos=2, reader=["app1.services.opencv_qr_reader.OpenCVQRReader"],
+                     output=salida.name, stdout=io.StringIO())
+        with open(salida.name, encoding="utf-8") as f:
+            resultado = json.load(f)
+
+        # 2 formatos x 2 zapatos x 13 degradaciones + 1 página de pedido por formato y dpi
+        self.assertEqual(resultado["corpus"]["imagenes"], 2 * 2 * 13 + 2 * 3)
+        medida, = resultado["readers"]
+        self.assertEqual(medida["reader"], "app1.services.opencv_qr_reader.OpenCVQRReader")
+        self.assertEqual(medida["recall_por_degradacion"]["original"], 1.0)
+        self.assertCountEqual(medida["recall_por_degradacion"], ["original", "rotacion", "blur", "jpeg", "dpi", "multi"])
+        self.assertLessEqual(medida["latencia_p50_ms"], medida["latencia_p95_ms"])
+
+    def test_latencias_sin_tracemalloc(self):
+        class Espia(QRReader):
+            trazando = []
+
+            def decode(self, image_or_bytes):
+                self.trazando.append(tracemalloc.is_tracing())
+                return codificar_compacto(1)
+
+        corpus = [MuestraQR("compact/original", "original", imagen_qrs(1), {1})] * 3
+        resultado = medir_reader(Espia(), corpus)
+        # Primero la pasada cronometrada, después la de memoria
+        self.assertEqual(Espia.trazando, [False] * 3 + [True] * 3)
+        self.assertEqual(resultado["recall"], 1.0)
+
+    def test_readers_registrados(self):
+        readers = readers_registrados()
+        self.assertIn("app1.services.opencv_qr_reader.OpenCVQRReader", readers)
+        self.assertIn("app1.services.cascade_qr_reader.CascadeQRReader", readers)
+        self.assertNotIn("app1.services.qr_reader.QRReader", readers)
+
+
+class VideoQRTests(SimpleTestCase):
+    def setUp(self):
+        archivo = tempfile.NamedTemporaryFile(suffix=".mp4", delete=False)
+        archivo.close()
+        self.ruta = archivo.name
+        self.addCleanup(os.remove, self.ruta)
+        # 10 fps: el 1, nada, el 2 y el 3 juntos y otra vez el 1
+        video = cv2.VideoWriter(self.ruta, cv2.VideoWriter_fourcc(*"mp4v"), 10, (640, 360))
+        for ids in [(1,)] * 10 + [()] * 5 + [(2, 3)] * 10 + [(1,)] * 5:
+            video.write(self.fotograma(ids))
+        video.release()
+
+    @staticmethod
+    def fotograma(ids):
+        gris = np.full((360, 640), 255, dtype=np.uint8)
+        if ids:
+            qrs = cv2.resize(imagen_qrs(*ids), None, fx=0.9, fy=0.9, interpolation=cv2.INTER_AREA)
+            gris[20:20 + qrs.shape[0], 20:20 + qrs.shape[1]] = qrs
+        return cv2.cvtColor(gris, cv2.COLOR_GRAY2BGR)
+
+    def test_cada_codigo_una_vez(self):
+        service = QRService(mock.Mock(spec=QRReader), video_reader=OpenCVQRReader())
+        with mock.patch.object(QRService, "decode_frame", wraps=service.decode_frame) as decode_frame:
+            payloads = list(service.iter_video_payloads(self.ruta))
+        self.assertEqual([p["id"] for p in payloads], [1, 2, 3])
+        # 4 muestras/s de 30 fotogramas: ~15, y las de escena quieta se saltan
+        self.assertLess(decode_frame.call_count, 10)
+        service.reader.decode_multi.assert_not_called()  # los videos van con video_reader
+
+    def test_subida_de_video(self):
+        with open(self.ruta, "rb") as f:
+            subida = SimpleUploadedFile("escaneo.MP4", f.read())
+        payloads = QRService(OpenCVQRReader()).extract_payloads(subida)
+        self.assertEqual([p["id"] for p in payloads], [1, 2, 3])
+
+    def test_video_ilegible(self):
+        with redirect_stdout(io.StringIO()) as salida:
+            self.assertEqual(list(QRService(OpenCVQRReader()).iter_video_payloads("/no/existe.mp4")), [])
+        self.assertIn("No se pudo abrir el video", salida.getvalue())
+
+
+class CargarQRTests(TestCase):
+    def setUp(self):
+        self.client.force_login(Empleado.objects.create_user("empleado", "e@zodiak.co", "clave"))
+        self.pendiente = crear_zapato()
+        self.en_bodega = crear_zapato(estado="Bodega")
+        self.entregado = crear_zapato(estado="Entregado")
+
+    def test_paso_1_muestra_los_zapatos_leidos(self):
+        _, png = cv2.imencode(".png", imagen_qrs(self.pendiente.id, self.en_bodega.id, 999999))
+        respuesta = self.client.post(reverse("cargar_qr"), {
+            "archivo": SimpleUploadedFile("etiquetas.png", png.tobytes(), content_type="image/png"),
+        })
+        self.assertCountEqual(respuesta.context["zapatos"], [self.pendiente, self.en_bodega])
+        self.assertCountEqual(respuesta.context["zapato_info"], [str(self.pendiente.id), str(self.en_bodega.id)])
+        self.assertEqual(respuesta.context["mensaje"], "1 QR sin coincidencia en la base de datos.")
+
+    def test_paso_1_sin_qr(self):
+        _, png = cv2.imencode(".png", np.full((200, 200), 255, dtype=np.uint8))
+        respuesta = self.client.post(reverse("cargar_qr"), {"archivo": SimpleUploadedFile("vacia.png", png.tobytes())})
+        self.assertEqual(respuesta.context["mensaje"], "No se detectaron zapatos válidos en el archivo.")
+
+    def test_paso_2_actualiza_e_informa(self):
+        ids = [self.pendiente.id, self.en_bodega.id, self.entregado.id]
+        respuesta = self.client.post(reverse("cargar_qr"), {
+            "estado_nuevo": "Producción", "zapato_info": [*map(str, ids), "999999", "abc"],
+        })
+        self.assertEqual(respuesta.context["resultado"], [self.pendiente])
+        self.assertEqual(
+            respuesta.context["mensaje"],
+            "1 zapato(s) actualizado(s) a 'Producción'. No existen: 999999."
+            f" No pueden pasar de 'Bodega' a 'Producción': {self.en_bodega.id}."
+            f" No pueden pasar de 'Entregado' a 'Producción': {self.entregado.id}."
+            " Ids no válidos: abc.",
+        )
+        estados_ahora = dict(Zapato.objects.values_list("id", "estado"))
+        self.assertEqual([estados_ahora[i] for i in ids], ["Producción", "Bodega", "Entregado"])
+        self.assertEqual(list(ZapatoEvento.objects.values_list("zapato_id", flat=True)), [self.pendiente.id])
+
+    def test_paso_2_estado_desconocido(self):
+        respuesta = self.client.post(reverse("cargar_qr"), {
+            "estado_nuevo": "Perdido", "zapato_info": [str(self.pendiente.id)],
+        })
+        self.assertEqual(respuesta.context["mensaje"], "Estado no válido.")
+        self.pendiente.refresh_from_db()
+        self.assertEqual(self.pendiente.estado, "Pendientes")
+
+
+class EstadoServiceTests(TestCase):
+    def test_aplica_solo_transiciones_permitidas(self):
+        pendiente = crear_zapato()
+        entregado = crear_zapato(estado="Entregado")
+        en_bodega = crear_zapato(estado="Bodega")
+
+        resultado = aplicar_transicion(Zapato.objects.all(), "Pendientes")
+
+        self.assertEqual(resultado.actualizados, {"Bodega": [en_bodega.id]})
+        self.assertEqual(resultado.sin_cambio, [pendiente.id])
+        self.assertEqual(resultado.rechazados, {"Entregado": [entregado.id]})
+        entregado.refresh_from_db()
+        self.assertEqual(entregado.estado, "Entregado")
+
+    def test_estado_desconocido(self):
+        with self.assertRaises(ValueError):
+            aplicar_transicion(Zapato.objects.all(), "Perdido")
+
+    def test_campos_en_el_mismo_update(self):
+        zapato = crear_zapato()
+        pedido = Pedido.objects.create(cliente=Cliente.objects.create(nombre="ACME"))
+        aplicar_transicion(Zapato.objects.filter(id=zapato.id), "Producción", pedido=pedido)
+        zapato.refresh_from_db()
+        self.assertEqual((zapato.estado, zapato.pedido_id), ("Producción", pedido.id))
+
+
+class CarritoTests(TestCase):
+    def setUp(self):
+        self.usuario = Empleado.objects.create_user("empleado", "e@zodiak.co", "clave")
+        self.client.force_login(self.usuario)
+        self._poner_en_carrito()
+
+    def _poner_en_carrito(self):
+        sesion = self.client.session
+        sesion["pedido"] = {"AP40RHA": {
+            "modelo": "Apache", "talla": "40", "sexo": "H", "color": "Rojo",
+            "requerimientos": "", "observaciones": "", "cantidad": 1,
+        }}
+        sesion.save()
+
+    def _actualizar_cantidad(self, cantidad):
+        self.client.post(reverse("actualizar_pedido"), {"producto_id": "AP40RHA", "cantidad": cantidad})
+
+    def test_altas_con_los_ids_creados(self):
+        self._actualizar_cantidad(3)
+        ids = set(Zapato.objects.values_list("id", flat=True))
+        self.assertEqual(len(ids), 2)
+        self.assertEqual(set(ZapatoEvento.objects.values_list("zapato_id", flat=True)), ids)
+
+    def test_altas_sin_ids_de_bulk_create(self):
+        # Como en MySQL: bulk_create no devuelve los ids
+        with mock.patch.object(type(connection.features), "can_return_rows_from_bulk_insert", False):
+            self._actualizar_cantidad(3)
+        ids = set(Zapato.objects.values_list("id", flat=True))
+        self.assertEqual(len(ids), 2)
+        self.assertEqual(set(ZapatoEvento.objects.values_list("zapato_id", flat=True)), ids)
+
+
+    def test_quitar_del_carrito_no_crece_con_la_cantidad(self):
+        consultas = []
+        for cantidad in (20, 200):
+            self._actualizar_cantidad(cantidad)
+            with CaptureQueriesContext(connection) as capturadas:
+                self.client.post(reverse("eliminar_pedido"), {"producto_id": "AP40RHA"})
+            consultas.append(len(capturadas))
+            self._poner_en_carrito()
+        self.assertFalse(Zapato.objects.exists())
+        self.assertEqual(StockResumen.objects.filter(cantidad__gt=0).count(), 0)
+        # Solo cambia el número de lotes del INSERT de eventos y del DELETE
+        self.assertLessEqual(consultas[1] - consultas[0], 2)
+
+
+class VerStockTests(TestCase):
+    def setUp(self):
+        self.client.force_login(Empleado.objects.create_user("empleado", "e@zodiak.co", "clave"))
+        for i in range(60):
+            crear_zapato(referencia=f"R{i % 7}", modelo=("Apache", "Apolo", "Bota")[i % 3], sexo="HM"[i % 2])
+
+    def _recorrer(self, url):
+        vistos, totales = [], set()
+        while url:
+            respuesta = self.client.get(url)
+            vistos += [z["id"] for z in respuesta.context["zapatos"]]
+            totales.add(respuesta.context["total"])
+            url = respuesta.context["url_siguiente"] and reverse("ver_stock") + respuesta.context["url_siguiente"]
+        return vistos, totales
+
+    def test_paginas_sin_saltos_ni_repetidos(self):
+        esperados = list(Zapato.objects.filter(sexo="H").order_by("modelo", "referencia", "id")
+                         .values_list("id", flat=True))
+        vistos, totales = self._recorrer(reverse("ver_stock") + "?sexo=H&por_pagina=25")
+        self.assertEqual(vistos, esperados)
+        self.assertEqual(totales, {30})
+
+    def test_volver_a_la_pagina_anterior(self):
+        primera = self.client.get(reverse("ver_stock") + "?por_pagina=25").context
+        segunda = self.client.get(reverse("ver_stock") + primera["url_siguiente"]).context
+        vuelta = self.client.get(reverse("ver_stock") + segunda["url_anterior"]).context
+        self.assertEqual([z["id"] for z in vuelta["zapatos"]], [z["id"] for z in primera["zapatos"]])
+
+    def test_total_no_viene_de_la_url(self):
+        respuesta = self.client.get(reverse("ver_stock") + "?modelo=Bota&total=999")
+        self.assertEqual(respuesta.context["total"], 20)
+        respuesta = self.client.get(reverse("ver_stock") + "?referencia=r3&total=999")
+        self.assertEqual(respuesta.context["total"], Zapato.objects.filter(referencia="R3").count())
+
+
+class StockResumenTests(TestCase):
+    def conteo(self):
+        return dict(StockResumen.objects.filter(cantidad__gt=0).values_list("estado", "cantidad"))
+
+    def test_altas_cambios_y_transiciones(self):
+        zapato = crear_zapato()
+        crear_zapato()
+        self.assertEqual(self.conteo(), {"Pendientes": 2})
+
+        zapato.estado = "Bodega"
+        zapato.save()
+        aplicar_transicion(Zapato.objects.filter(estado="Pendientes"), "Producción")
+        self.assertEqual(self.conteo(), {"Bodega": 1, "Producción": 1})
+        self.assertEqual(stock_service.reconstruir(), 0)
+
+    def test_borrados(self):
+        cliente = Cliente.objects.create(nombre="ACME")
+        crear_zapato(pedido=Pedido.objects.create(cliente=cliente))
+        suelto = crear_zapato(estado="Bodega")
+        crear_zapato(estado="Bodega")
+
+        cliente.delete()  # en cascada: Pedido -> Zapato
+        self.assertEqual(self.conteo(), {"Bodega": 2})
+        suelto.delete()
+        self.assertEqual(self.conteo(), {"Bodega": 1})
+        Zapato.objects.all().delete()
+        self.assertEqual(self.conteo(), {})
+        self.assertEqual(stock_service.reconstruir(), 0)
+
+
+    def test_borrado_en_bloque(self):
+        cliente = Cliente.objects.create(nombre="ACME")
+        pedido = Pedido.objects.create(cliente=cliente)
+        for i in range(30):
+            crear_zapato(estado=("Bodega", "Pendientes")[i % 2], pedido=pedido if i < 6 else None)
+
+        with CaptureQueriesContext(connection) as consultas, borrado_en_bloque():
+            Zapato.objects.filter(pedido__isnull=True).delete()
+            cliente.delete()  # y sus zapatos en cascada, en el mismo bloque
+        ajustes = [q for q in consultas.captured_queries if q["sql"].startswith('UPDATE "app1_stockresumen"')]
+        self.assertEqual(len(ajustes), 2)  # uno por clave, no uno por zapato
+        self.assertEqual(self.conteo(), {})
+        self.assertEqual(stock_service.reconstruir(), 0)
+
+    def test_borrado_en_bloque_fallido(self):
+        crear_zapato()
+        with self.assertRaises(RuntimeError), borrado_en_bloque():
+            Zapato.objects.all().delete()
+            raise RuntimeError
+        self.assertEqual(Zapato.objects.count(), 1)
+        self.assertEqual(self.conteo(), {"Pendientes": 1})
+        crear_zapato().delete()  # fuera del bloque vuelve a ir fila a fila
+        self.assertEqual(self.conteo(), {"Pendientes": 1})
+
+
+class ReadCacheTests(TestCase):
+    def setUp(self):
+        self.cache = ReadCache(max_entradas=2, max_filas=3)
+        self.calculos = 0
+
+    def modelos(self):
+        def calcular():
+            self.calculos += 1
+            return sorted(Zapato.objects.values_list("modelo", flat=True).distinct())
+        return self.cache.obtener("modelos", [Zapato], calcular, lista=True)
+
+    def test_acierto(self):
+        crear_zapato()
+        self.assertEqual(self.modelos(), ["Apache"])
+        with self.assertNumQueries(1):  # solo la generación
+            self.assertEqual(self.modelos(), ["Apache"])
+        self.assertEqual(self.calculos, 1)
+
+    def test_invalidan_altas_cambios_borrados_y_transiciones(self):
+        zapato = crear_zapato()
+        self.modelos()
+        bota = crear_zapato(modelo="Bota")
+        self.assertEqual(self.modelos(), ["Apache", "Bota"])
+        zapato.modelo = "Apolo"
+        zapato.save()
+        self.assertEqual(self.modelos(), ["Apolo", "Bota"])
+        bota.delete()
+        self.assertEqual(self.modelos(), ["Apolo"])
+        aplicar_transicion(Zapato.objects.all(), "Bodega")
+        self.modelos()
+        Zapato.objects.all().delete()
+        self.assertEqual(self.modelos(), [])
+        self.assertEqual(self.calculos, 6)
+
+    def test_borrado_en_bloque_sube_la_generacion_una_vez(self):
+        for _ in range(5):
+            crear_zapato()
+        antes, = generaciones([Zapato])
+        with borrado_en_bloque():
+            Zapato.objects.all().delete()
+        self.assertEqual(generaciones([Zapato]), (antes + 1,))
+
+    def test_lru_y_limite_de_filas(self):
+        for clave in ("a", "b", "a", "c"):
+            self.cache.obtener(clave, [], lambda: clave)
+        # "b" fue la menos usada: salió al entrar "c"
+        self.assertEqual(self.cache.obtener("b", [], lambda: "recalculado"), "recalculado")
+        self.assertEqual(self.cache.obtener("a", [], lambda: "recalculado"), "recalculado")  # salió al volver "b"
+        self.assertEqual(self.cache.obtener("b", [], lambda: "otro"), "recalculado")
+        grande = self.cache.obtener("grande", [], lambda: iter(range(4)), lista=True)
+        self.assertEqual(grande, [0, 1, 2, 3])
+        self.assertEqual(self.cache.obtener("grande", [], lambda: [], lista=True), [])  # no se guardó
+
+    def test_vistas_tras_borrar(self):
+        self.client.force_login(Empleado.objects.create_user("empleado", "e@zodiak.co", "clave"))
+        crear_zapato()
+        bota = crear_zapato(referencia="BO38AMM", modelo="Bota", sexo="M")
+        self.assertIn("Bota", self.client.get(reverse("ver_stock")).context["modelos"])
+        self.assertEqual([z["id"] for z in self.client.get(reverse("buscar_productos"), {"q": "bota"})
+                          .context["resultados"]], [bota.id])
+
+        bota.delete()
+        self.assertNotIn("Bota", self.client.get(reverse("ver_stock")).context["modelos"])
+        self.assertEqual(self.client.get(reverse("buscar_productos"), {"q": "bota"}).context["resultados"], [])
+
+
+class QueryPlanTests(TestCase):
+    def test_consultas_criticas_usan_indices(self):
+        for plan in verificar_planes():
+            with self.subTest(consulta=plan.nombre):
+                self.assertEqual(plan.tablas_escaneadas, [], "\n".join(plan.plan))
+
+
+class BusquedaTests(TestCase):
+    def test_prefijos_y_fragmentos_de_referencia(self):
+        apache = crear_zapato(referencia="AP40RHA", requerimientos="suela antideslizante")
+        bota = crear_zapato(referencia="BO38AMM", modelo="Bota", sexo="M", requerimientos="40rha en la nota")
+
+        self.assertEqual(buscar("apa").ids, [apache.id])
+        self.assertEqual(buscar("antides").ids, [apache.id])
+        # Fragmento de referencia: primero lo que está en el índice, después el resto
+        self.assertEqual(buscar("40RHA").ids, [bota.id, apache.id])
+        self.assertEqual(buscar("40rha hombre").ids, [apache.id])
+
+
+class TypeaheadTests(TestCase):
+    def setUp(self):
+        # Los índices viven en el proceso: que no arrastren datos de otro test
+        for indice in (indice_clientes(), indice_referencias()):
+            indice._marcar_sucio()
+        self.indice = indice_referencias()
+
+    def crear(self, **campos):
+        with self.captureOnCommitCallbacks(execute=True):
+            return crear_zapato(**campos)
+
+    def test_altas_y_bajas_incrementales(self):
+        self.crear(referencia="AP40RHA")
+        self.assertEqual(self.indice.buscar("ap"), ["AP40RHA"])
+
+        otro = self.crear(referencia="AP41RHA")
+        repetido = self.crear(referencia="AP41RHA")
+        with self.assertNumQueries(1):  # solo la generación: no se reconstruye
+            self.assertEqual(self.indice.buscar("ap4"), ["AP40RHA", "AP41RHA"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            otro.delete()
+        self.assertEqual(self.indice.buscar("ap41"), ["AP41RHA"])  # queda otro zapato con esa referencia
+        with self.captureOnCommitCallbacks(execute=True):
+            repetido.delete()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.indice.buscar("ap41"), [])
+
+    def test_cambios_de_estado_no_tocan_la_generacion(self):
+        zapato = self.crear()
+        antes = generaciones([CLAVE_REFERENCIAS])
+        with self.captureOnCommitCallbacks(execute=True):
+            zapato.estado = "Bodega"
+            zapato.save()
+            aplicar_transicion(Zapato.objects.all(), "Entregado")
+        self.assertEqual(generaciones([CLAVE_REFERENCIAS]), antes)
+
+    def test_escrituras_de_otro_proceso(self):
+        self.crear(referencia="AP40RHA")
+        self.assertEqual(self.indice.buscar("bo"), [])
+        # Otro proceso: inserta sin señales de este y sube la generación
+        Zapato.objects.bulk_create([Zapato(referencia="BO38AMM", referencia_normalizada="BO38AMM", modelo="Bota",
+                                           talla="38", sexo="M", color="Azul", requerimientos="")])
+        GeneracionCache.objects.filter(modelo=CLAVE_REFERENCIAS).update(valor=F("valor") + 1)
+        self.assertEqual(self.indice.buscar("bo"), ["BO38AMM"])
+
+    def test_borrado_en_bloque(self):
+        for referencia in ("AP40RHA", "AP40RHA", "AP41RHA", "BO38AMM"):
+            self.crear(referencia=referencia)
+        self.assertEqual(self.indice.buscar("a"), ["AP40RHA", "AP41RHA"])
+        antes, = generaciones([CLAVE_REFERENCIAS])
+        with CaptureQueriesContext(connection) as consultas, self.captureOnCommitCallbacks(execute=True):
+            with borrado_en_bloque():
+                Zapato.objects.filter(referencia_normalizada__startswith="AP").delete()
+        # Una sola consulta para ver qué referencias quedan
+        self.assertEqual(sum('"referencia_normalizada" IN' in q["sql"] for q in consultas.captured_queries), 1)
+        self.assertEqual(generaciones([CLAVE_REFERENCIAS]), (antes + 1,))
+        with self.assertNumQueries(1):
+            self.assertEqual(self.indice.buscar("a"), [])
+        self.assertEqual(self.indice.buscar("b"), ["BO38AMM"])
+
+    @override_settings(TYPEAHEAD_MAX_RESULTS=2)
+    def test_endpoint_acota_resultados(self):
+        self.client.force_login(Empleado.objects.create_user("empleado", "e@zodiak.co", "clave"))
+        for i in range(4):
+            with self.captureOnCommitCallbacks(execute=True):
+                Cliente.objects.create(nombre=f"Acme {i}")
+        respuesta = self.client.get(reverse("typeahead_clientes"), {"q": "acme", "limite": 50})
+        self.assertEqual(respuesta.json(), {"resultados": ["Acme 0", "Acme 1"]})
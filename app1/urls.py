@@ -15,14 +15,17 @@ from .views import (
 
     # Clientes / carrito / pedidos
     VerClientesView, CrearClientesView, VerCarritoView,
-    AgregarPedidoView, GenerarPedidoView,
+    AgregarPedidoView, GenerarPedidoView, EtiquetasView,
 
     # Gestión de pedidos y sus zapatos
     PedidoListView, PedidoZapatosView,
     EliminarPedidoView, EliminarTodoPedidoView, ActualizarPedidoView,
 
     # QR / Stock
-    CargarQRView, VerStockView,
+    CargarQRView, VerStockView, StockResumenView,
+
+    # Autocompletado
+    ClientesTypeaheadView, ReferenciasTypeaheadView,
 )
 
 urlpatterns = [
@@ -33,6 +36,7 @@ urlpatterns = [
 
     # Stock
     path("ver_stock/", VerStockView.as_view(), name="ver_stock"),
+    path("resumen_stock/", StockResumenView.as_view(), name="resumen_stock"),
 
     # Clientes / carrito / pedidos
     path("ver_clientes/", VerClientesView.as_view(), name="ver_clientes"),
@@ -50,9 +54,16 @@ urlpatterns = [
     path("eliminar_todo_pedido/", EliminarTodoPedidoView.as_view(), name="eliminar_todo_pedido"),
     path("actualizar_pedido/", ActualizarPedidoView.as_view(), name="actualizar_pedido"),
 
+    # Hojas de etiquetas QR
+    path("etiquetas/", EtiquetasView.as_view(), name="etiquetas"),
+
     # Carga de QR
     path("cargar_qr/", CargarQRView.as_view(), name="cargar_qr"),
 
+    # Autocompletado (JSON)
+    path("api/clientes/", ClientesTypeaheadView.as_view(), name="typeahead_clientes"),
+    path("api/referencias/", ReferenciasTypeaheadView.as_view(), name="typeahead_referencias"),
+
     # Categorías (los names se mantienen)
     path("categorias/", CategoriasView.as_view(), name="categorias"),
     path("zapatos/apache_hombre/", ApacheHombreView.as_view(), name="apache_hombre"),
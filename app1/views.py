@@ -2,20 +2,11 @@
 
 # Standard library
 import os
-import json
-import re
-from io import BytesIO
+import tempfile
+from urllib.parse import urlencode
 from string import ascii_uppercase
 from abc import ABC, abstractmethod
 
-# Third-party libs
-import qrcode
-import cv2
-import numpy as np
-import fitz
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-
 # Django
 from django.conf import settings
 from django.utils import timezone
@@ -24,8 +15,9 @@ from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Q
-from django.http import HttpResponse, HttpResponseNotAllowed
+from django.db import transaction
+from django.db.models import Sum
+from django.http import FileResponse, HttpResponseNotAllowed, JsonResponse
 from django.shortcuts import render, redirect
 from django.urls import reverse_lazy
 from django.views import View
@@ -35,9 +27,25 @@ from django.views.generic import (
 
 # Local
 from .services.qr_service import QRService
-from .services.qr_reader import QRReader
-from .forms import ClientesForm, ZapatoForm, QRFileUploadForm
-from .models import Cliente, Zapato, Pedido
+from .services.qr_generator import QRBatchGenerator, QR_DIRECTORY
+from .services.qr_cache import QRCache
+from .services.decode_cache import DecodeResultCache
+from .services.keyset import KeysetPaginator
+from .services.referencia import ReferenciaBuilder
+from .services.busqueda import buscar
+from .services import listados, stock_service
+from .services.borrado_service import borrado_en_bloque
+from .services.read_cache import ReadCache, incrementar
+from .services.typeahead import indice_clientes, indice_referencias, referencias_agregadas
+from .services.zapato_resolver import resolver_por_lotes, actualizar_estado_lote
+from .services.estado_service import aplicar_transicion, estados
+from .services.eventos_service import (
+    ORIGEN_CARRITO, ORIGEN_PEDIDO, registrar_altas, registrar_bajas, registrar_transicion,
+)
+from .services.pedido_pdf import PedidoPDFBuilder
+from .services.label_sheet import get_label_sheet_builder
+from .forms import ClientesForm, QRFileUploadForm
+from .models import Cliente, Zapato, Pedido, StockResumen
 
 # -----------------------------
 # Manejo de errores CSRF
@@ -212,22 +220,31 @@ class BotaMujerView(BaseCategoriaView):
 
 
 # (Patrón pequeño: Mixin para centralizar el contexto del carrito)
+_read_cache = None
+
+def get_read_cache():
+    """Caché de lecturas (facetas y búsquedas) compartida por el proceso."""
+    global _read_cache
+    if _read_cache is None:
+        _read_cache = ReadCache(
+            max_entradas=getattr(settings, "READ_CACHE_MAX_ENTRIES", 256),
+            max_filas=getattr(settings, "READ_CACHE_MAX_ROWS", 2000),
+        )
+    return _read_cache
+
+
 class CarritoContextMixin:
     """
     Mixin para inyectar en el contexto:
     - pedido (desde sesión)
-    - clientes (para selects, etc.)
+    Los clientes ya no se inyectan: el formulario los pide a ClientesTypeaheadView.
     """
     def get_carrito(self):
         return self.request.session.get('pedido', {})
 
-    def get_clientes(self):
-        return Cliente.objects.all()
-
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         ctx.setdefault('pedido', self.get_carrito())
-        ctx.setdefault('clientes', self.get_clientes())
         return ctx
 
 
@@ -255,68 +272,38 @@ class CrearClientesView(LoginRequiredMixin, CreateView):
 
 class VerCarritoView(LoginRequiredMixin, CarritoContextMixin, TemplateView):
     template_name = 'ver_carrito.html'
-    # CarritoContextMixin ya añade 'pedido' y 'clientes' al contexto.
+    # CarritoContextMixin ya añade 'pedido' al contexto.
 
 # -----------------------------
 # Crear codigos QR únicos para un zapato
+# (la lógica vive en services.qr_generator)
 # ----------------------------
-def generar_codigo_qr(zapato):
-    """
-    Genera un código QR para un zapato y devuelve la imagen.
-    """
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    
-    data = {
-        'id': zapato.id,
-        'referencia': zapato.referencia,
-        'modelo': zapato.modelo,
-        'talla': zapato.talla,
-        'sexo': zapato.sexo,
-        'color': zapato.color,
-        'requerimientos': zapato.requerimientos,
-        'observaciones': zapato.observaciones,
-        'estado': zapato.estado,
-        # 'pedido': zapato.pedido,
-    }
-    
-    qr.add_data(json.dumps(data, ensure_ascii=False))  # Convierte los datos a JSON y los agrega al QR
-    qr.make(fit=True)
-    return qr.make_image(fill_color="black", back_color="white")
-
-def guardar_qr(zapato, img):
-    """
-    Guarda la imagen del QR en un directorio específico.
-    """
-    qr_directory = 'qr_codes/'  # Directorio donde se guardarán los QR
-    os.makedirs(qr_directory, exist_ok=True)  # Crea el directorio si no existe
-    qr_path = os.path.join(qr_directory, f"zapato_{zapato.id}.png")
-    img.save(qr_path)
-    return qr_path
+_qr_cache = None
+
+def get_qr_cache():
+    """Caché de QR compartida por el proceso (se crea la primera vez)."""
+    global _qr_cache
+    if _qr_cache is None:
+        _qr_cache = QRCache(
+            directorio=getattr(settings, "QR_CACHE_DIR", os.path.join(QR_DIRECTORY, "cache")),
+            max_memoria=getattr(settings, "QR_CACHE_MEMORY_ITEMS", 1024),
+            max_bytes_disco=getattr(settings, "QR_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+        )
+    return _qr_cache
 
 
+def get_qr_batch_generator():
+    """Construye el generador por lotes con la configuración de settings."""
+    return QRBatchGenerator(
+        workers=getattr(settings, "QR_BATCH_WORKERS", None),
+        min_paralelo=getattr(settings, "QR_BATCH_MIN_PARALLEL", 20),
+        cache=get_qr_cache(),
+        formato=getattr(settings, "QR_PAYLOAD_FORMAT", "json"),
+    )
 
 
 # --- Pequeña utilidad para construir la referencia ---
-class ReferenciaBuilder:
-    """
-    Encapsula la regla actual de construcción de la clave:
-    {2 primeras del modelo}{talla}{inicial color}{sexo inicial}{letra}
-    """
-    @staticmethod
-    def build(modelo: str, talla: str, color: str, sexo: str, letra: str) -> str:
-        modelo = (modelo or "").strip()
-        talla = str(talla or "").strip()
-        color = (color or "").strip()
-        sexo = (sexo or "").strip()
-        letra = (letra or "").strip().upper()
-
-        letra_sexo = sexo[:1].upper()
-        return f"{modelo[:2].upper()}{talla}{(color[:1] or '').upper()}{letra_sexo}{letra}"
+# (vive en services.referencia; se re-exporta aquí)
 
 # --- Vista basada en clase para agregar al pedido ---
 class AgregarPedidoView(LoginRequiredMixin, View):
@@ -368,16 +355,19 @@ class AgregarPedidoView(LoginRequiredMixin, View):
 
         # 4) crea/recupera Zapato en BD (misma lógica que tenías)
         zapato, created = Zapato.objects.get_or_create(
-            referencia=clave_base,
+            referencia_normalizada=ReferenciaBuilder.normalizar(clave_base),
             modelo=modelo,
             talla=talla,
             sexo=letra_sexo,
             color=color,
             defaults={
+                'referencia': clave_base,
                 'requerimientos': requerimientos,
                 'observaciones': observaciones,
             }
         )
+        if created:
+            registrar_altas([zapato], request.user, ORIGEN_CARRITO)
 
         # 5) guarda sesión y redirige
         request.session['pedido'] = pedido
@@ -389,41 +379,8 @@ class AgregarPedidoView(LoginRequiredMixin, View):
         return HttpResponseNotAllowed(['POST'])
 
 
-class PedidoPDFBuilder:
-    """Pequeño helper para construir el PDF del pedido (Facade/Utility)."""
-    def __init__(self, pedido, cliente, zapato_info):
-        self.pedido = pedido
-        self.cliente = cliente
-        self.zapato_info = zapato_info
-
-    def build_pdf_bytesio(self):
-        buffer = BytesIO()
-        c = canvas.Canvas(buffer, pagesize=letter)
-
-        # Título y cabecera
-        c.setFont("Helvetica-Bold", 16)
-        c.drawString(200, 750, f"Pedido #{self.pedido.id}")
-        c.setFont("Helvetica", 12)
-        c.drawString(50, 730, f"Cliente: {self.cliente.nombre}")
-        c.drawString(50, 710, f"Fecha: {self.pedido.fecha_creacion.strftime('%Y-%m-%d %H:%M:%S')}")
-        c.drawString(50, 690, f"Observaciones: {self.pedido.observaciones}")
-
-        # Detalle zapatos
-        y = 650
-        for info in self.zapato_info:
-            if y < 100:
-                c.showPage()
-                y = 750
-            c.drawString(50, y,        f"Id: {info['id']}")
-            c.drawString(50, y - 20,   f"Referencia: {info['referencia']}")
-            c.drawString(50, y - 40,   f"Modelo: {info['modelo']}")
-            c.drawString(50, y - 60,   f"Talla: {info['talla']}")
-            c.drawImage(info['qr_path'], 400, y - 70, width=100, height=100)
-            y -= 120
-
-        c.save()
-        buffer.seek(0)
-        return buffer
+# --- PDF del pedido ---
+# (PedidoPDFBuilder vive en services.pedido_pdf; se re-exporta aquí)
 
 
 class GenerarPedidoView(LoginRequiredMixin, View):
@@ -460,53 +417,35 @@ class GenerarPedidoView(LoginRequiredMixin, View):
             observaciones=comentario,
         )
 
-        qr_paths = []
-        zapato_info = []
+        ids_pedido = []
 
         # Mueve zapatos 'Pendientes' del carrito a este pedido y a 'Producción'
-        for ref_id, producto in pedido_data.items():
-            cantidad = int(producto.get('cantidad', 1))
-            zapatos = Zapato.objects.filter(referencia=ref_id, estado='Pendientes')[:cantidad]
-
-            for z in zapatos:
-                z.pedido = pedido
-                z.estado = 'Producción'
-                z.save()
-
-                qr_img = generar_codigo_qr(z)
-                qr_path = guardar_qr(z, qr_img)
-                qr_paths.append(qr_path)
-
-                zapato_info.append({
-                    'id': z.id,
-                    'referencia': z.referencia,
-                    'modelo': z.modelo,
-                    'talla': z.talla,
-                    'sexo': z.sexo,
-                    'color': z.color,
-                    'requerimientos': z.requerimientos,
-                    'observaciones': z.observaciones,
-                    'estado': z.estado,
-                    'qr_path': qr_path,
-                })
-
-        # Construir PDF (mismo contenido de antes, encapsulado)
-        pdf_builder = PedidoPDFBuilder(pedido, cliente, zapato_info)
-        pdf_buffer = pdf_builder.build_pdf_bytesio()
-
-        # Guardar PDF en disco (misma ruta que usabas)
+        # (un UPDATE por referencia, validado con Zapato.TRANSICIONES)
+        with transaction.atomic():
+            for ref_id, producto in pedido_data.items():
+                cantidad = int(producto.get('cantidad', 1))
+                pendientes = Zapato.objects.filter(
+                    referencia_normalizada=ReferenciaBuilder.normalizar(ref_id), estado='Pendientes',
+                ).order_by('id')[:cantidad]
+                resultado = aplicar_transicion(pendientes, 'Producción', pedido=pedido)
+                registrar_transicion(resultado, 'Producción', request.user, ORIGEN_PEDIDO)
+                ids_pedido.extend(resultado.ids_actualizados)
+
+        zapatos_pedido = list(Zapato.objects.filter(id__in=ids_pedido).order_by('id'))
+
+        # Construir PDF escribiéndolo directo a disco (misma ruta que usabas)
+        modo_qr = getattr(settings, "QR_PDF_MODE", "vector")
+        zapato_info = self.iter_zapato_info(zapatos_pedido, modo_qr)
         pdf_path = os.path.join(settings.MEDIA_ROOT, 'pdf_pedidos', f"pedido_{pedido.id}.pdf")
-        os.makedirs(os.path.dirname(pdf_path), exist_ok=True)
-        with open(pdf_path, 'wb') as f:
-            f.write(pdf_buffer.getvalue())
+        PedidoPDFBuilder(pedido, cliente, zapato_info, modo_qr=modo_qr).build_pdf_file(pdf_path)
 
         # Limpiar carrito
         if 'pedido' in request.session:
             del request.session['pedido']
             request.session.modified = True
 
-        # Respuesta inline
-        response = HttpResponse(pdf_buffer, content_type='application/pdf')
+        # Respuesta inline (FileResponse envía el archivo por bloques)
+        response = FileResponse(open(pdf_path, 'rb'), content_type='application/pdf')
         response['Content-Disposition'] = f'inline; filename="pedido_{pedido.id}.pdf"'
         messages.success(request, f"Pedido #{pedido.id} generado exitosamente.")
         return response
@@ -514,6 +453,82 @@ class GenerarPedidoView(LoginRequiredMixin, View):
     def get(self, request):
         return HttpResponseNotAllowed(['POST'])
 
+    def iter_zapato_info(self, zapatos, modo_qr, chunk=500):
+        """
+        Genera los QR (en paralelo si el pedido es grande) y produce la info
+        de cada zapato para el PDF. En modo vector solo hacen falta las
+        matrices: no se escribe ningún PNG y se calculan por bloques para
+        no tener todas en memoria a la vez.
+        """
+        generador = get_qr_batch_generator()
+        if modo_qr == "vector":
+            lotes = (zapatos[i:i + chunk] for i in range(0, len(zapatos), chunk))
+            pares = (
+                (z, None, m)
+                for lote in lotes
+                for z, m in zip(lote, generador.matrices(lote))
+            )
+        else:
+            pares = ((z, p, None) for z, p in zip(zapatos, generador.generate(zapatos)))
+
+        for z, qr_path, qr_matriz in pares:
+            yield {
+                'id': z.id,
+                'referencia': z.referencia,
+                'modelo': z.modelo,
+                'talla': z.talla,
+                'sexo': z.sexo,
+                'color': z.color,
+                'requerimientos': z.requerimientos,
+                'observaciones': z.observaciones,
+                'estado': z.estado,
+                'qr_path': qr_path,
+                'qr_matriz': qr_matriz,
+            }
+
+
+# ====== HOJAS DE ETIQUETAS (impresión masiva de QR) ======
+# (el builder vive en services.label_sheet; se re-exporta aquí)
+class EtiquetasView(LoginRequiredMixin, View):
+    """
+    Devuelve un PDF con las etiquetas QR de los zapatos filtrados.
+    GET: referencia, modelo, talla, color, sexo (lista), estado (lista),
+         columnas, filas (de 1 a 10). Sin filtros imprime todo el stock.
+    Como se genera en la petición, hay un máximo de etiquetas
+    (LABEL_SHEET_MAX_WEB); para más, el comando generar_etiquetas.
+    """
+    def get(self, request):
+        filtros = {}
+        if request.GET.get("referencia"):
+            filtros["referencia_normalizada"] = ReferenciaBuilder.normalizar(request.GET["referencia"])
+        for campo in ("modelo", "talla", "color"):
+            if request.GET.get(campo):
+                filtros[campo] = request.GET[campo]
+        for campo in ("sexo", "estado"):
+            if request.GET.getlist(campo):
+                filtros[f"{campo}__in"] = request.GET.getlist(campo)
+
+        try:
+            columnas = int(request.GET.get("columnas") or 0)
+            filas = int(request.GET.get("filas") or 0)
+        except ValueError:
+            columnas = filas = 0
+
+        zapatos = Zapato.objects.filter(**filtros).order_by("modelo", "referencia", "id")
+        maximo = getattr(settings, "LABEL_SHEET_MAX_WEB", 2000)
+        if zapatos[:maximo + 1].count() > maximo:
+            messages.error(request, f"Son más de {maximo} etiquetas: filtre más o use "
+                                    f"'manage.py generar_etiquetas'.")
+            return redirect('ver_stock')
+
+        # Archivo temporal: se borra solo al cerrarlo FileResponse
+        pdf = tempfile.TemporaryFile()
+        get_label_sheet_builder(columnas, filas).build(zapatos, pdf)
+        pdf.seek(0)
+        nombre = f"etiquetas_{timezone.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+        response = FileResponse(pdf, content_type='application/pdf')
+        response['Content-Disposition'] = f'inline; filename="{nombre}"'
+        return response
 
 
 # ====== LISTAR PEDIDOS ======
@@ -536,7 +551,7 @@ class PedidoZapatosView(LoginRequiredMixin, DetailView):
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         pedido = self.object
-        ctx['zapatos'] = Zapato.objects.filter(pedido=pedido)
+        ctx['zapatos'] = listados.pedido(pedido)
         ctx['pdf_url'] = f"{settings.MEDIA_URL}pdf_pedidos/pedido_{pedido.id}.pdf"
         return ctx
 
@@ -575,7 +590,10 @@ class RemoveItemCommand(CartCommand):
 
     def execute(self):
         # mismo comportamiento que tenías: borrar en DB por referencia
-        Zapato.objects.filter(referencia=self.producto_id).delete()
+        zapatos = Zapato.objects.filter(referencia_normalizada=ReferenciaBuilder.normalizar(self.producto_id))
+        with borrado_en_bloque():
+            registrar_bajas(zapatos, self.cart.request.user, ORIGEN_CARRITO)
+            zapatos.delete()
         # quitar del carrito en sesión
         if self.producto_id in self.cart.cart:
             del self.cart.cart[self.producto_id]
@@ -589,7 +607,10 @@ class ClearCartCommand(CartCommand):
 
     def execute(self):
         if self.producto_id:
-            Zapato.objects.filter(referencia=self.producto_id).delete()
+            zapatos = Zapato.objects.filter(referencia_normalizada=ReferenciaBuilder.normalizar(self.producto_id))
+            with borrado_en_bloque():
+                registrar_bajas(zapatos, self.cart.request.user, ORIGEN_CARRITO)
+                zapatos.delete()
         self.cart.clear()
 
 
@@ -606,17 +627,34 @@ class UpdateQtyCommand(CartCommand):
                 cantidad = int(self.nueva_cantidad)
                 if cantidad >= 1:
                     pedido[self.producto_id]['cantidad'] = cantidad
-                    # mismo comportamiento: crear registros extra en DB
-                    for _ in range(cantidad - 1):
-                        Zapato.objects.create(
-                            referencia=self.producto_id,
-                            modelo=pedido[self.producto_id]['modelo'],
-                            talla=pedido[self.producto_id]['talla'],
-                            sexo=pedido[self.producto_id]['sexo'],
-                            color=pedido[self.producto_id]['color'],
-                            requerimientos=pedido[self.producto_id]['requerimientos'],
-                            observaciones=pedido[self.producto_id]['observaciones'],
-                        )
+                    # mismo comportamiento: crear registros extra en DB (en un solo INSERT)
+                    item = pedido[self.producto_id]
+                    referencia = ReferenciaBuilder.normalizar(self.producto_id)
+                    with transaction.atomic():
+                        nuevos = Zapato.objects.bulk_create([
+                            Zapato(
+                                referencia=self.producto_id,
+                                referencia_normalizada=referencia,
+                                modelo=item['modelo'],
+                                talla=item['talla'],
+                                sexo=item['sexo'],
+                                color=item['color'],
+                                requerimientos=item['requerimientos'],
+                                observaciones=item['observaciones'],
+                            )
+                            for _ in range(cantidad - 1)
+                        ])
+                        if nuevos and nuevos[0].pk is None:
+                            # MySQL no devuelve los ids de un INSERT en bloque: son los
+                            # últimos creados con esa referencia (misma transacción)
+                            nuevos = list(Zapato.objects.filter(
+                                referencia_normalizada=referencia, estado='Pendientes', pedido__isnull=True,
+                            ).order_by('-id')[:len(nuevos)])
+                        # bulk_create no dispara post_save
+                        registrar_altas(nuevos, self.cart.request.user, ORIGEN_CARRITO)
+                        stock_service.sumar_zapatos(nuevos)
+                        referencias_agregadas([referencia], [z.pk for z in nuevos])
+                        incrementar(Zapato)
                     self.cart.save()
             except ValueError:
                 pass
@@ -665,36 +703,82 @@ class ActualizarPedidoView(View):
 # =========================
 # views.py (solo el fragmento relevante de CargarQRView.post)
 
+_decode_cache = None
+
+def get_decode_cache():
+    """Caché de resultados de lectura compartida por el proceso."""
+    global _decode_cache
+    if _decode_cache is None:
+        _decode_cache = DecodeResultCache(
+            ttl=getattr(settings, "QR_DECODE_CACHE_TTL", 3600),
+            max_entradas=getattr(settings, "QR_DECODE_CACHE_MAX_ENTRIES", 64),
+            max_payloads=getattr(settings, "QR_DECODE_CACHE_MAX_PAYLOADS", 50000),
+        )
+    return _decode_cache
+
+
+_qr_readers = {}
+
+def get_qr_reader(setting, por_defecto="app1.services.opencv_qr_reader.OpenCVQRReader"):
+    """
+    Reader de la clase configurada en `setting`, uno por proceso: así se
+    reutilizan sus detectores (y sus estadísticas) entre peticiones.
+    """
+    cls_path = getattr(settings, setting, por_defecto)
+    if cls_path not in _qr_readers:
+        reader = import_string(cls_path)()
+        if hasattr(reader, "log_cada"):  # readers en cascada: etapas al log
+            reader.log_cada = getattr(settings, "QR_READER_STATS_EVERY", 1000)
+        _qr_readers[cls_path] = reader
+    return _qr_readers[cls_path]
+
+
+def get_qr_service():
+    """QRService con el reader, la paralelización y la caché de settings."""
+    return QRService(
+        get_qr_reader("QR_READER_CLASS"),
+        workers=getattr(settings, "QR_EXTRACT_WORKERS", 1),
+        min_paginas_paralelo=getattr(settings, "QR_EXTRACT_MIN_PAGES", 8),
+        cache=get_decode_cache(),
+        video_reader=get_qr_reader("QR_VIDEO_READER_CLASS"),
+        video_muestras_por_segundo=getattr(settings, "QR_VIDEO_SAMPLES_PER_SECOND", 4),
+    )
+
+
 class CargarQRView(LoginRequiredMixin, View):
     template_name = "cargar_qr.html"
 
     def get(self, request):
         form = QRFileUploadForm()
-        estados = ['Bodega', 'Pendientes', 'Producción', 'Anulado', 'Completado', 'Entregado']
-        return render(request, self.template_name, {"form": form, "estados": estados})
+        return render(request, self.template_name, {"form": form, "estados": estados(Zapato)})
 
     def post(self, request):
-        estados = ['Bodega', 'Pendientes', 'Producción', 'Anulado', 'Completado', 'Entregado']
+        estados_zapato = estados(Zapato)
 
-        # Paso 2: actualizar estado
+        # Paso 2: actualizar estado (un solo UPDATE atómico para todo el lote)
         if 'estado_nuevo' in request.POST:
             estado_nuevo = request.POST.get('estado_nuevo')
-            zapato_ids = request.POST.getlist('zapato_info')
-            actualizados = []
-            for zid in zapato_ids:
-                try:
-                    z = Zapato.objects.get(id=zid)
-                    z.estado = estado_nuevo
-                    z.save()
-                    actualizados.append(z)
-                except Zapato.DoesNotExist:
-                    continue
+            try:
+                lote = actualizar_estado_lote(request.POST.getlist('zapato_info'), estado_nuevo, request.user)
+            except ValueError:
+                return render(request, self.template_name, {
+                    "form": QRFileUploadForm(),
+                    "mensaje": "Estado no válido.",
+                    "estados": estados_zapato
+                })
+            actualizados = list(Zapato.objects.filter(id__in=lote.actualizados).order_by("id"))
 
             mensaje = f"{len(actualizados)} zapato(s) actualizado(s) a '{estado_nuevo}'."
+            if lote.faltantes:
+                mensaje += f" No existen: {', '.join(map(str, lote.faltantes))}."
+            for origen, ids in lote.rechazados.items():
+                mensaje += f" No pueden pasar de '{origen}' a '{estado_nuevo}': {', '.join(map(str, ids))}."
+            if lote.invalidos:
+                mensaje += f" Ids no válidos: {', '.join(lote.invalidos)}."
             return render(request, self.template_name, {
                 "resultado": actualizados,
                 "mensaje": mensaje,
-                "estados": estados
+                "estados": estados_zapato
             })
 
         # Paso 1: subir archivo
@@ -704,66 +788,42 @@ class CargarQRView(LoginRequiredMixin, View):
             return render(request, self.template_name, {
                 "form": form,
                 "mensaje": "Archivo no válido.",
-                "estados": estados
+                "estados": estados_zapato
             })
 
         archivo = form.cleaned_data["archivo"]
 
-        # Cargar implementación desde settings
-        cls_path = getattr(
-            settings,
-            "QR_READER_CLASS",
-            "app1.services.opencv_qr_reader.OpenCVQRReader"
-        )
-        ReaderClass = import_string(cls_path)
-        service = QRService(ReaderClass())
-
-        # Convertir archivo en imagen OpenCV
-        # Leer archivo en bytes
-        file_bytes = archivo.read()
-
+        service = get_qr_service()
 
+        # Decodificar QR (puede traer 1 o varios) y resolver los payloads
+        # contra la base de datos por lotes, a medida que se van leyendo
+        resolucion = resolver_por_lotes(service.iter_payloads(archivo))
+        zapatos = resolucion.zapatos
 
-        # Decodificar QR (puede traer 1 o varios)
-        payloads = service.extract_payloads(archivo)
-
-        if not payloads:
+        if not resolucion.leidos:
             return render(request, self.template_name, {
                 "form": QRFileUploadForm(),
                 "mensaje": "No se detectaron zapatos válidos en el archivo.",
-                "estados": estados
+                "estados": estados_zapato
             })
 
-        zapatos, zapato_infos = [], []
-
-        for payload in payloads:
-            try:
-                referencia = payload.get("referencia")
-                zapato_id = payload.get("id")
-
-                if zapato_id:
-                    # Si algún QR futuro trae id, usamos eso
-                    z = Zapato.objects.filter(id=zapato_id).first()
-                elif referencia:
-                    # Buscar por referencia (insensible a mayúsculas/minúsculas)
-                    z = Zapato.objects.filter(referencia__iexact=referencia).first()
-                else:
-                    z = None
-
-                if z:
-                    zapatos.append(z)
-                    zapato_infos.append(str(z.id))
-
-            except Zapato.DoesNotExist:
-                continue
-
         if not zapatos:
             return render(request, self.template_name, {
                 "form": QRFileUploadForm(),
                 "mensaje": "No se encontraron coincidencias en la base de datos.",
-                "estados": estados
+                "estados": estados_zapato
             })
 
+        mensaje = None
+        if resolucion.faltantes:
+            mensaje = f"{len(resolucion.faltantes)} QR sin coincidencia en la base de datos."
+        return render(request, self.template_name, {
+            "zapatos": zapatos,
+            "zapato_info": [str(z.id) for z in zapatos],
+            "mostrar_estado": True,
+            "mensaje": mensaje,
+            "estados": estados_zapato
+        })
 
 
 # =========================
@@ -771,42 +831,48 @@ class CargarQRView(LoginRequiredMixin, View):
 # =========================
 # views.py
 class VerStockView(LoginRequiredMixin, View):
+    """
+    Stock filtrable y paginado por cursor sobre (modelo, referencia, id).
+    Los filtros, el tamaño de página y el cursor viajan en la URL (GET),
+    así los enlaces de "Anterior"/"Siguiente" conservan el filtro.
+    El total sale de StockResumen; solo el filtro por referencia (que no
+    está en el resumen) necesita un COUNT, por el índice de referencia.
+    """
     template_name = "ver_stock.html"
+    orden = ("modelo", "referencia", "id")
+    tamanos_pagina = (25, 50, 100, 200)
 
     def _base_context(self):
+        # Facetas de los selects (las referencias se autocompletan aparte,
+        # con ReferenciasTypeaheadView): se recalculan solo cuando cambia algún zapato
+        return dict(get_read_cache().obtener("stock_facetas", [Zapato], self._facetas))
+
+    @staticmethod
+    def _facetas():
         return {
-            "referencias": Zapato.objects.values_list("referencia", flat=True).distinct(),
-            "modelos": Zapato.objects.values_list("modelo", flat=True).distinct(),
-            "tallas": Zapato.objects.values_list("talla", flat=True).distinct(),
-            "colores": Zapato.objects.values_list("color", flat=True).distinct(),
+            "modelos": list(Zapato.objects.values_list("modelo", flat=True).distinct()),
+            "tallas": list(Zapato.objects.values_list("talla", flat=True).distinct()),
+            "colores": list(Zapato.objects.values_list("color", flat=True).distinct()),
         }
 
     def get(self, request):
-        context = self._base_context()
-        context.update({
-            "zapatos": Zapato.objects.all(),
-            "total": Zapato.objects.count(),
-            # seleccionados vacíos en GET
-            "referencia_sel": "",
-            "modelo_sel": "",
-            "talla_sel": "",
-            "color_sel": "",
-            "sexo_sel": [],
-            "estado_sel": [],
-        })
-        return render(request, self.template_name, context)
+        return self._listar(request, request.GET)
 
     def post(self, request):
+        # Compatibilidad con el formulario anterior (POST): mismo listado
+        return self._listar(request, request.POST)
+
+    def _listar(self, request, datos):
         filtros = {}
-        referencia_sel = request.POST.get("referencia", "")
-        modelo_sel     = request.POST.get("modelo", "")
-        talla_sel      = request.POST.get("talla", "")
-        color_sel      = request.POST.get("color", "")
-        sexo_sel       = request.POST.getlist("sexo")
-        estado_sel     = request.POST.getlist("estado")
+        referencia_sel = datos.get("referencia", "")
+        modelo_sel     = datos.get("modelo", "")
+        talla_sel      = datos.get("talla", "")
+        color_sel      = datos.get("color", "")
+        sexo_sel       = datos.getlist("sexo")
+        estado_sel     = datos.getlist("estado")
 
         if referencia_sel:
-            filtros["referencia"] = referencia_sel
+            filtros["referencia_normalizada"] = ReferenciaBuilder.normalizar(referencia_sel)
         if modelo_sel:
             filtros["modelo"] = modelo_sel
         if talla_sel:
@@ -820,10 +886,28 @@ class VerStockView(LoginRequiredMixin, View):
 
         zapatos = Zapato.objects.filter(**filtros) if filtros else Zapato.objects.all()
 
+        por_pagina = self._por_pagina(datos.get("por_pagina"))
+        cursor = datos.get("despues") or datos.get("antes")
+        pagina = KeysetPaginator(listados.stock(zapatos), self.orden, por_pagina).pagina(cursor, atras=bool(datos.get("antes")))
+
+        total = stock_service.contar(filtros)
+        if total is None:
+            total = zapatos.count()
+
+        # Querystring del filtro actual, para los enlaces de paginación
+        base = [(k, v) for k, v in (("referencia", referencia_sel), ("modelo", modelo_sel),
+                                    ("talla", talla_sel), ("color", color_sel)) if v]
+        base += [("sexo", v) for v in sexo_sel] + [("estado", v) for v in estado_sel]
+        base += [("por_pagina", por_pagina)]
+
         context = self._base_context()
         context.update({
-            "zapatos": zapatos,
-            "total": zapatos.count(),
+            "zapatos": pagina.objetos,
+            "total": total,
+            "por_pagina": por_pagina,
+            "tamanos_pagina": self.tamanos_pagina,
+            "url_siguiente": f"?{urlencode(base + [('despues', pagina.siguiente)])}" if pagina.siguiente else "",
+            "url_anterior": f"?{urlencode(base + [('antes', pagina.anterior)])}" if pagina.anterior else "",
             # devolver lo seleccionado para “persistir” el filtro en el form
             "referencia_sel": referencia_sel,
             "modelo_sel": modelo_sel,
@@ -834,43 +918,101 @@ class VerStockView(LoginRequiredMixin, View):
         })
         return render(request, self.template_name, context)
 
+    def _por_pagina(self, valor):
+        try:
+            valor = int(valor)
+        except (TypeError, ValueError):
+            return getattr(settings, "STOCK_PAGE_SIZE", 50)
+        return valor if valor in self.tamanos_pagina else getattr(settings, "STOCK_PAGE_SIZE", 50)
+
+
+class StockResumenView(LoginRequiredMixin, View):
+    """
+    Cuántos zapatos hay por modelo, talla, color, sexo y estado.
+    Solo lee StockResumen (nunca recorre la tabla de zapatos).
+    """
+    template_name = "resumen_stock.html"
+
+    def get(self, request):
+        seleccion = {campo: request.GET.get(campo, "") for campo in Zapato.CAMPOS_STOCK}
+        filas = StockResumen.objects.filter(cantidad__gt=0, **{k: v for k, v in seleccion.items() if v})
+        filas = filas.order_by(*Zapato.CAMPOS_STOCK)
+        return render(request, self.template_name, {
+            "filas": filas,
+            "total": filas.aggregate(total=Sum("cantidad"))["total"] or 0,
+            "seleccion": seleccion,
+            "modelos": Zapato.MODELO_CHOICES,
+            "tallas": Zapato.TALLAS_CHOICES,
+            "colores": Zapato.COLOR_CHOICES,
+            "sexos": Zapato.GENERO_CHOICES,
+            "estados": Zapato.ESTADO_CHOICES,
+        })
+
+
+# =========================
+# AUTOCOMPLETADO (JSON)
+# =========================
+class TypeaheadView(LoginRequiredMixin, View):
+    """
+    Sugerencias por prefijo (?q=...) desde un índice en memoria
+    (services.typeahead). Devuelve {"resultados": [...]}, como mucho
+    TYPEAHEAD_MAX_RESULTS (o ?limite=, si es menor).
+    """
+    indice = None
+
+    def get(self, request):
+        maximo = getattr(settings, "TYPEAHEAD_MAX_RESULTS", 20)
+        try:
+            limite = min(max(int(request.GET.get("limite", maximo)), 1), maximo)
+        except ValueError:
+            limite = maximo
+        resultados = self.indice().buscar(request.GET.get("q", ""), limite)
+        return JsonResponse({"resultados": resultados})
+
+
+class ClientesTypeaheadView(TypeaheadView):
+    indice = staticmethod(indice_clientes)
+
+
+class ReferenciasTypeaheadView(TypeaheadView):
+    indice = staticmethod(indice_referencias)
+
 
 # =============================
 # Búsqueda de productos
 # =============================
-from django.db.models import Q
 from .models import Zapato
 from django.views import View
 
 class BuscarProductosView(LoginRequiredMixin, View):
+    """
+    Búsqueda por el índice de texto (services.busqueda): resultados por
+    relevancia y paginados, con `pagina` en la URL.
+    """
     template_name = "buscar_productos.html"
 
     def get(self, request):
         query = request.GET.get("q", "").strip()
-
-        qs = Zapato.objects.all()
-        if query:
-            qs = qs.filter(
-                Q(referencia__icontains=query) |
-                Q(modelo__icontains=query) |
-                Q(color__icontains=query) |
-                Q(sexo__icontains=query[:1].upper())  
-            )
-
-        resultados = []
-        for z in qs.order_by("modelo", "sexo", "referencia"):
-           
-            if z.imagen:
-                z.imagen_categoria = z.imagen
-            else:
-                sufijo = 'H' if z.sexo == 'H' else 'M'
-                z.imagen_categoria = f"images/{z.modelo}{sufijo}1.png"
-            resultados.append(z)
+        try:
+            pagina = max(int(request.GET.get("pagina", 1)), 1)
+        except ValueError:
+            pagina = 1
+        resultados, hay_mas = get_read_cache().obtener(
+            ("buscar", query, pagina), [Zapato], lambda: self._buscar(query, pagina))
 
         return render(request, self.template_name, {
             "resultados": resultados,
             "query": query,
+            "pagina": pagina,
+            "pagina_anterior": pagina - 1 if pagina > 1 else None,
+            "pagina_siguiente": pagina + 1 if hay_mas else None,
             "colores": COLORES,
             "tallas": TALLAS,
         })
 
+    @staticmethod
+    def _buscar(query, pagina):
+        # Filas ligeras (solo lo que pinta la plantilla, con la imagen
+        # resuelta en SQL) en vez de instancias completas de Zapato
+        encontrados = buscar(query, pagina, getattr(settings, "SEARCH_PAGE_SIZE", 24))
+        return listados.busqueda(encontrados.ids), encontrados.hay_mas
@@ -137,4 +137,59 @@ CSRF_FAILURE_VIEW = 'app1.views.csrf_failure'
 
 
 # Implementación por defecto de QRReader
-QR_READER_CLASS = "app1.services.opencv_qr_reader.OpenCVQRReader"
+# (OpenCVQRReader es la versión simple, sin reintentos)
+QR_READER_CLASS = "app1.services.cascade_qr_reader.CascadeQRReader"
+# Cada cuántas imágenes el reader en cascada imprime qué etapa resolvió cada una (0 = nunca)
+QR_READER_STATS_EVERY = 1000
+
+# Generación de QR por lotes (None = un proceso por CPU, 1 = siempre en serie)
+QR_BATCH_WORKERS = None
+QR_BATCH_MIN_PARALLEL = 20  # por debajo de este número de zapatos no se usa el pool
+
+# Caché de imágenes QR (memoria LRU + disco con límite de tamaño)
+QR_CACHE_DIR = os.path.join('qr_codes', 'cache')
+QR_CACHE_MEMORY_ITEMS = 1024
+QR_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Formato del payload de las etiquetas nuevas: "json" (legado, zapato completo)
+# o "compact" (Z1:<id>:<checksum>, QR más pequeño). La lectura acepta ambos.
+QR_PAYLOAD_FORMAT = "compact"
+
+# Cómo se dibujan los QR en el PDF del pedido: "vector" (rectángulos, sin PNG)
+# o "imagen" (PNG generado en disco)
+QR_PDF_MODE = "vector"
+
+# Rejilla por defecto de las hojas de etiquetas (columnas x filas por página carta)
+LABEL_SHEET_COLUMNS = 3
+LABEL_SHEET_ROWS = 10
+# Máximo de etiquetas por hoja generada desde la web (más: comando generar_etiquetas)
+LABEL_SHEET_MAX_WEB = 2000
+
+# Lectura de PDFs escaneados: procesos para repartir las páginas
+# (1 = en serie) y mínimo de páginas para usar el pool
+QR_EXTRACT_WORKERS = os.cpu_count() or 1
+QR_EXTRACT_MIN_PAGES = 8
+
+# Caché de resultados de lectura de QR por huella del archivo subido
+QR_DECODE_CACHE_TTL = 60 * 60  # segundos
+QR_DECODE_CACHE_MAX_ENTRIES = 64
+QR_DECODE_CACHE_MAX_PAYLOADS = 50000
+
+# Videos con QR (MP4, MOV...): reader de una sola pasada (cada código sale
+# en muchos fotogramas) y fotogramas muestreados por segundo
+QR_VIDEO_READER_CLASS = "app1.services.opencv_qr_reader.OpenCVQRReader"
+QR_VIDEO_SAMPLES_PER_SECOND = 4
+
+# Filas por página por defecto en Ver Stock (el usuario puede elegir 25/50/100/200)
+STOCK_PAGE_SIZE = 50
+
+# Caché de lecturas (facetas de stock, búsquedas, clientes) invalidada por
+# generación de modelo; las búsquedas con más filas que el máximo no se guardan
+READ_CACHE_MAX_ENTRIES = 256
+READ_CACHE_MAX_ROWS = 2000
+
+# Resultados por página en la búsqueda de productos
+SEARCH_PAGE_SIZE = 24
+
+# Sugerencias como máximo por consulta en los autocompletados (clientes, referencias)
+TYPEAHEAD_MAX_RESULTS = 20